@@ -7,20 +7,2230 @@ import subprocess
 import sys
 import os
 import signal
+import mmap
+import struct
+import threading
+import time
+import bisect
+import re
+import socket
+import shlex
+import shutil
+import sqlite3
+import tempfile
+import unicodedata
+import heapq
+import itertools
+import urllib.parse
+import xml.parsers.expat
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 # Suppress the GioUnix deprecation warning
 import warnings
 warnings.filterwarnings('ignore', category=DeprecationWarning)
 
 FAVORITES_FILE = Path.home() / ".config" / "launcher-favorites.json"
+PROFILES_FILE = Path.home() / ".config" / "launcher-profiles.json"
+SETTINGS_FILE = Path.home() / ".config" / "launcher-settings.json"
 LOCK_FILE = Path("/tmp/pylauncher.lock")
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / ".cache") / "pylauncher"
+ICON_ATLAS_FILE = CACHE_DIR / "icon-atlas.bin"
+CATALOG_SNAPSHOT_FILE = CACHE_DIR / "catalog.json"
+LAUNCH_HISTORY_FILE = CACHE_DIR / "launch-history.json"
+FILE_INDEX_DIR = CACHE_DIR / "files"
+UNICODE_INDEX_FILE = CACHE_DIR / f"unicode-{unicodedata.unidata_version}-v2.idx"
+DATA_DIR = Path(os.environ.get('XDG_DATA_HOME') or Path.home() / ".local/share") / "pylauncher"
+QUERY_LOG_FILE = DATA_DIR / "query-log.jsonl"
+WAKEUP_REPORT_FILE = CACHE_DIR / "wakeups.json"
+BOOKMARK_INDEX_FILE = CACHE_DIR / "bookmarks.sqlite"
+# Minimum time between mtime sweeps of the home directory index
+FILE_INDEX_SWEEP_SECONDS = 600
+FILE_INDEX_MAX_ENTRIES = 1_000_000
+# Changed paths and directories kept beside the main file index before
+# a sweep merges them into it
+FILE_INDEX_DELTA_MAX = 20_000
+# Minimum time between checks of the browser databases, and how much
+# history (most visited first) each one contributes to the index
+BOOKMARK_REFRESH_SECONDS = 300
+BOOKMARK_HISTORY_LIMIT = 20_000
+
+CATEGORY_ICONS = {
+    'Multimedia': 'applications-multimedia',
+    'Development': 'applications-development',
+    'Education': 'applications-science',
+    'Games': 'applications-games',
+    'Graphics': 'applications-graphics',
+    'Internet': 'applications-internet',
+    'Office': 'applications-office',
+    'Science': 'applications-science',
+    'Settings': 'preferences-system',
+    'System Tools': 'applications-system',
+    'Accessories': 'applications-accessories',
+    'Other': 'applications-other',
+}
+
+DEFAULT_SETTINGS = {
+    # Focus an app's open window (via compositor IPC) instead of relaunching it
+    'focus_running_windows': True,
+    # Warm the page cache for likely launches (opt-in)
+    'prefetch_apps': False,
+    'prefetch_top_n': 5,
+    'prefetch_budget_mb': 256,
+    # Log search keystrokes and activations for pylauncher_bench.py replay (opt-in)
+    'record_queries': False,
+}
+
+# Search path for shared libraries without RUNPATH/RPATH
+LIBRARY_DIRS = [
+    '/lib64', '/usr/lib64', '/lib', '/usr/lib',
+    '/lib/x86_64-linux-gnu', '/usr/lib/x86_64-linux-gnu',
+    '/lib/aarch64-linux-gnu', '/usr/lib/aarch64-linux-gnu',
+    '/usr/local/lib',
+]
+# Files warmed more recently than this are assumed to still be cached
+PREFETCH_REWARM_SECONDS = 600
+
+# Queries shorter than this never fall back to typo-tolerant matching
+FUZZY_MIN_LENGTH = 3
+
+# Category lists longer than this are not built speculatively
+PREFETCH_MAX_ROWS = 150
+
+# App rows shown for a search; later tiers are matched in idle slices of
+# SEARCH_CHUNK_SIZE apps, each slice running for at most SEARCH_SLICE_SECONDS
+SEARCH_MAX_ROWS = 20
+SEARCH_CHUNK_SIZE = 256
+SEARCH_SLICE_SECONDS = 0.004
+
+
+class QueryCache:
+    """Small LRU memo of normalized query -> ranked desktop ids.
+
+    Entries are only valid for the catalog generation they were computed
+    against; a lookup with a newer generation drops the whole memo.
+    """
+
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.generation = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, generation):
+        if generation != self.generation:
+            self.entries.clear()
+            self.generation = generation
+        ids = self.entries.get(key)
+        if ids is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return ids
+
+    def put(self, key, generation, ids):
+        if generation != self.generation:
+            return
+        self.entries[key] = ids
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate, 3),
+        }
+
+
+def _pattern_masks(pattern):
+    masks = {}
+    for i, c in enumerate(pattern):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks
+
+
+def _edit_distance(masks, length, text):
+    """Bit-parallel (Myers/Hyyrö) edit distance between a pattern and text"""
+    if length == 0:
+        return len(text)
+    mask = (1 << length) - 1
+    last = 1 << (length - 1)
+    pv, mv, score = mask, 0, length
+    for c in text:
+        eq = masks.get(c, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+def levenshtein(a, b):
+    """Edit distance between two strings"""
+    return _edit_distance(_pattern_masks(b), len(b), a)
+
+
+class BKTree:
+    """Burkhard-Keller tree: finds all words within an edit distance of a query
+    while only visiting subtrees the triangle inequality can't rule out."""
+
+    def __init__(self, words=()):
+        self.root = None  # (word, {distance: child node})
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        masks, length = _pattern_masks(word), len(word)
+        node = self.root
+        while True:
+            distance = _edit_distance(masks, length, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return
+            node = child
+
+    def search(self, word, max_distance):
+        """Return sorted (distance, word) pairs within max_distance"""
+        for results in self.search_steps(word, max_distance):
+            pass
+        return results
+
+    def search_steps(self, word, max_distance, step=256):
+        """search() in pieces: yields None after every step nodes, then the results"""
+        masks, length = _pattern_masks(word), len(word)
+        results = []
+        stack = [self.root] if self.root else []
+        visited = 0
+        while stack:
+            node_word, children = stack.pop()
+            distance = _edit_distance(masks, length, node_word)
+            if distance <= max_distance:
+                results.append((distance, node_word))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+            visited += 1
+            if visited % step == 0:
+                yield None
+        yield sorted(results)
+
+
+class IconAtlas:
+    """Pre-rasterized icons packed into one memory-mapped file.
+
+    Layout: magic, little-endian u32 header length, JSON header, pixel data.
+    The header maps "<Gio.Icon string>@<pixel size>" to
+    [offset, length, width, height, rowstride, has_alpha, source, mtime_ns, theme]
+    where offset is relative to the end of the header. Themed icons are only
+    valid for the icon theme they were rendered from, and every entry is
+    revalidated against its source file's mtime in the background.
+    """
+
+    MAGIC = b"PLICONS1"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.theme = ''
+        self.entries = {}
+        self.pending = {}  # key -> entry with the pixbuf in place of the offset
+        self.map = None
+        self.data_start = 0
+        self.dirty = False
+
+    def open(self, theme):
+        self.theme = theme or ''
+        try:
+            with open(self.path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.map[:len(self.MAGIC)] != self.MAGIC:
+                raise ValueError("not an icon atlas")
+            header_start = len(self.MAGIC) + 4
+            (header_len,) = struct.unpack_from('<I', self.map, len(self.MAGIC))
+            header = json.loads(self.map[header_start:header_start + header_len])
+            self.data_start = header_start + header_len
+        except (OSError, ValueError, struct.error):
+            # Missing, empty or corrupt: start over
+            self._close()
+            self.dirty = self.path.exists()
+            return
+
+        for key, entry in header.items():
+            offset, length, theme = entry[0], entry[1], entry[8]
+            if (theme and theme != self.theme) or self.data_start + offset + length > len(self.map):
+                self.dirty = True
+                continue
+            self.entries[key] = entry
+
+    def _close(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = None
+        self.entries = {}
+
+    def lookup(self, key):
+        pending = self.pending.get(key)
+        if pending is not None:
+            return pending[0]
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        offset, length, width, height, rowstride, has_alpha = entry[:6]
+        start = self.data_start + offset
+        data = GLib.Bytes.new(self.map[start:start + length])
+        return GdkPixbuf.Pixbuf.new_from_bytes(
+            data, GdkPixbuf.Colorspace.RGB, has_alpha, 8, width, height, rowstride)
+
+    def add(self, key, pixbuf, source, theme):
+        try:
+            mtime = os.stat(source).st_mtime_ns if source else 0
+        except OSError:
+            mtime = 0
+        self.pending[key] = [pixbuf, None, pixbuf.get_width(), pixbuf.get_height(),
+                             pixbuf.get_rowstride(), pixbuf.get_has_alpha(), source, mtime, theme]
+        self.entries.pop(key, None)
+        self.dirty = True
+
+    def stale_keys(self):
+        """Drop and return keys whose source file changed or disappeared"""
+        stale = []
+        for key, entry in list(self.entries.items()):
+            source, mtime = entry[6], entry[7]
+            try:
+                current = os.stat(source).st_mtime_ns if source else 0
+            except OSError:
+                current = None
+            if current != mtime:
+                del self.entries[key]
+                stale.append(key)
+        if stale:
+            self.dirty = True
+        return stale
+
+    def save(self):
+        """Write kept and newly rasterized icons to a fresh file and remap it"""
+        if not self.dirty:
+            return False
+
+        header = {}
+        chunks = []
+        offset = 0
+        for key, entry in self.entries.items():
+            start = self.data_start + entry[0]
+            chunk = self.map[start:start + entry[1]]
+            header[key] = [offset, len(chunk)] + entry[2:]
+            chunks.append(chunk)
+            offset += len(chunk)
+        for key, entry in self.pending.items():
+            if entry[2] * entry[3] == 0:
+                continue
+            chunk = entry[0].get_pixels()
+            header[key] = [offset, len(chunk)] + entry[2:]
+            chunks.append(chunk)
+            offset += len(chunk)
+
+        header_bytes = json.dumps(header, separators=(',', ':')).encode()
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(self.MAGIC)
+                f.write(struct.pack('<I', len(header_bytes)))
+                f.write(header_bytes)
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return False
+
+        self._close()
+        self.pending = {}
+        self.dirty = False
+        self.open(self.theme)
+        return False
+
+
+def xdg_application_dirs():
+    """Return the applications/ directories to scan, highest precedence first"""
+    home = Path.home()
+    data_home = os.environ.get('XDG_DATA_HOME') or str(home / ".local/share")
+    data_dirs = os.environ.get('XDG_DATA_DIRS') or "/usr/local/share:/usr/share"
+
+    # Flatpak normally adds its exports to XDG_DATA_DIRS; keep them as a
+    # fallback for sessions that were started without its profile script.
+    roots = [data_home, str(home / ".local/share/flatpak/exports/share")]
+    roots += data_dirs.split(':')
+    roots.append("/var/lib/flatpak/exports/share")
+
+    app_dirs = []
+    for root in roots:
+        # The spec says relative entries must be ignored
+        if not os.path.isabs(root):
+            continue
+        app_dir = os.path.join(os.path.normpath(root), "applications")
+        if app_dir not in app_dirs:
+            app_dirs.append(app_dir)
+    return app_dirs
+
+
+class ApplicationScanner:
+    """Recursive .desktop discovery following the desktop entry spec.
+
+    Directory listings are cached by mtime so a rescan only re-lists
+    directories that gained or lost entries, and parsed entries are cached
+    by file mtime/size so unchanged files are never parsed twice.
+    """
+
+    def __init__(self):
+        self.dir_cache = {}    # dir path -> (mtime_ns, desktop file names, subdir names)
+        self.entry_cache = {}  # file path -> ((mtime_ns, size), app_data; None if hidden, False if invalid)
+
+    def scan(self, app_dirs):
+        """Map desktop ID -> file path; the first directory providing an ID wins"""
+        found = {}
+        for desktop_id, path in self.candidates(app_dirs):
+            found.setdefault(desktop_id, path)
+        return found
+
+    def candidates(self, app_dirs):
+        """Yield (desktop ID, file path) for every entry, highest precedence first"""
+        for app_dir in app_dirs:
+            visited = set()
+            for rel_path, path in self._walk(app_dir, "", visited):
+                # kde4/foo.desktop has the desktop ID kde4-foo.desktop
+                yield rel_path.replace('/', '-'), path
+
+    def _walk(self, directory, prefix, visited):
+        try:
+            st = os.stat(directory)
+        except OSError:
+            self.dir_cache.pop(directory, None)
+            return
+        # Guard against symlink loops (common in NixOS profiles)
+        if (st.st_dev, st.st_ino) in visited:
+            return
+        visited.add((st.st_dev, st.st_ino))
+
+        cached = self.dir_cache.get(directory)
+        if cached and cached[0] == st.st_mtime_ns:
+            files, subdirs = cached[1], cached[2]
+        else:
+            files, subdirs = [], []
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.name.endswith(".desktop"):
+                                if entry.is_file():
+                                    files.append(entry.name)
+                            elif entry.is_dir():
+                                subdirs.append(entry.name)
+                        except OSError:
+                            continue
+            except OSError:
+                return
+            files.sort()
+            subdirs.sort()
+            self.dir_cache[directory] = (st.st_mtime_ns, files, subdirs)
+
+        for name in files:
+            yield prefix + name, os.path.join(directory, name)
+        for name in subdirs:
+            yield from self._walk(os.path.join(directory, name), prefix + name + '/', visited)
+
+    def load(self, app_dirs):
+        """Return the visible applications sorted by name"""
+        apps_by_id = {}
+        entry_cache = {}
+
+        for desktop_id, path in self.candidates(app_dirs):
+            id_key = desktop_id.lower()
+            # Higher-precedence valid entries (including hidden ones) mask the rest
+            if id_key in apps_by_id:
+                continue
+
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+
+            cached = self.entry_cache.get(path)
+            if cached and cached[0] == stamp and (not cached[1] or cached[1]['desktop_id'] == desktop_id):
+                app_data = cached[1]
+            else:
+                app_data = self._parse(desktop_id, path)
+            entry_cache[path] = (stamp, app_data)
+            # An unreadable entry must not hide a valid one further down
+            if app_data is False:
+                continue
+            apps_by_id[id_key] = app_data
+
+        # Drop cache entries for files that disappeared
+        self.entry_cache = entry_cache
+
+        unique_apps = [app for app in apps_by_id.values() if app is not None]
+        return sorted(unique_apps, key=lambda x: x['name'].lower())
+
+    def _parse(self, desktop_id, path):
+        """Parse one entry; None means hidden or NoDisplay, False invalid"""
+        try:
+            app_info = Gio.DesktopAppInfo.new_from_filename(path)
+        except Exception:
+            return False
+
+        if not app_info or not app_info.get_name():
+            return False
+
+        if app_info.get_nodisplay() or app_info.get_is_hidden():
+            return None
+
+        name = app_info.get_name()
+
+        return {
+            'name': name,
+            'description': app_info.get_description() or '',
+            'icon': app_info.get_icon(),
+            'desktop_id': desktop_id,
+            'desktop_path': path,
+            'app_info': app_info,
+            'keywords': ' '.join(app_info.get_keywords() or []).lower(),
+            'generic_name': (app_info.get_generic_name() or '').lower(),
+            'categories': app_info.get_categories() or '',
+            'mime_types': list(app_info.get_supported_types() or []),
+        }
+
+
+# Catalog fields that survive a restart; app_info is recreated lazily
+SNAPSHOT_FIELDS = ('name', 'description', 'desktop_id', 'desktop_path',
+                   'keywords', 'generic_name', 'categories')
+
+
+def catalog_snapshot(apps):
+    """JSON-serializable form of an application list"""
+    snapshot = []
+    for app in apps:
+        entry = {field: app[field] for field in SNAPSHOT_FIELDS}
+        entry['icon'] = app['icon'].to_string() if app['icon'] else None
+        entry['mime_types'] = app['mime_types']
+        snapshot.append(entry)
+    return snapshot
+
+
+def write_catalog_snapshot(snapshot, path=CATALOG_SNAPSHOT_FILE):
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def read_catalog_snapshot(path=CATALOG_SNAPSHOT_FILE):
+    """Rebuild app dicts from the last snapshot; [] if there is none"""
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return []
+
+    apps = []
+    for entry in snapshot:
+        try:
+            app = {field: entry[field] for field in SNAPSHOT_FIELDS}
+        except (KeyError, TypeError):
+            continue
+        try:
+            app['icon'] = Gio.Icon.new_for_string(entry['icon']) if entry.get('icon') else None
+        except Exception:
+            app['icon'] = None
+        app['mime_types'] = entry.get('mime_types') or []
+        app['app_info'] = None
+        apps.append(app)
+    return apps
+
+
+def mimeapps_list_files():
+    """mimeapps.list files in lookup order, highest precedence first"""
+    home = Path.home()
+    config_home = os.environ.get('XDG_CONFIG_HOME') or str(home / ".config")
+    config_dirs = (os.environ.get('XDG_CONFIG_DIRS') or "/etc/xdg").split(':')
+    desktops = [d.lower() for d in os.environ.get('XDG_CURRENT_DESKTOP', '').split(':') if d]
+
+    files = []
+    for directory in [config_home] + config_dirs:
+        if os.path.isabs(directory):
+            files += [os.path.join(directory, f"{d}-mimeapps.list") for d in desktops]
+            files.append(os.path.join(directory, "mimeapps.list"))
+    # Deprecated locations, still honoured by GIO
+    for app_dir in xdg_application_dirs():
+        files += [os.path.join(app_dir, f"{d}-mimeapps.list") for d in desktops]
+        files.append(os.path.join(app_dir, "mimeapps.list"))
+    return files
+
+
+def read_mimeapps_lists(paths):
+    """Merge the association sections of mimeapps.list files.
+
+    Returns {section: {mime type: [desktop IDs]}} for the Default
+    Applications, Added Associations and Removed Associations sections,
+    with IDs from higher-precedence files first.
+    """
+    sections = {name: defaultdict(list) for name in
+                ('Default Applications', 'Added Associations', 'Removed Associations')}
+    for path in paths:
+        try:
+            with open(path, errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        section = None
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('['):
+                section = sections.get(line.strip('[]'))
+                continue
+            if section is None or '=' not in line:
+                continue
+            mime, ids = line.split('=', 1)
+            targets = section[mime.strip()]
+            for desktop_id in ids.split(';'):
+                desktop_id = desktop_id.strip()
+                if desktop_id and desktop_id not in targets:
+                    targets.append(desktop_id)
+    return sections
+
+
+class MimeIndex:
+    """Inverted index from MIME type to the apps that can open it.
+
+    Built from the catalog's MimeType= lists plus the user's mimeapps.list
+    associations, so answering "what opens this?" never walks the app
+    list or asks GIO for every installed application. Resolved lists,
+    which include apps registered for parent types (text/plain for
+    text/x-python), are cached per type.
+    """
+
+    def __init__(self, apps=(), associations=None):
+        associations = associations or {}
+        defaults = associations.get('Default Applications', {})
+        added = associations.get('Added Associations', {})
+        removed = associations.get('Removed Associations', {})
+
+        self.apps_by_id = {app['desktop_id']: app for app in apps}
+        self.by_type = defaultdict(list)
+        for mime, ids in added.items():
+            self.by_type[mime] += [d for d in ids if d in self.apps_by_id]
+        for app in apps:
+            for mime in app['mime_types']:
+                if app['desktop_id'] not in removed.get(mime, ()) and app['desktop_id'] not in self.by_type[mime]:
+                    self.by_type[mime].append(app['desktop_id'])
+        self.defaults = {mime: [d for d in ids if d in self.apps_by_id]
+                         for mime, ids in defaults.items()}
+        self.resolved = {}
+
+    def apps_for(self, mime):
+        """[(app, is_default)] for a type: defaults, then direct, then parent-type handlers"""
+        cached = self.resolved.get(mime)
+        if cached is not None:
+            return cached
+
+        ranked = {}
+        def add(ids, is_default):
+            for desktop_id in ids:
+                if desktop_id not in ranked:
+                    ranked[desktop_id] = is_default
+
+        def add_defaults(ids, is_default):
+            # Only the first installed entry is the default; the rest are fallbacks
+            add(ids[:1], is_default)
+            add(ids[1:], False)
+
+        add_defaults(self.defaults.get(mime, []), True)
+        add(self.by_type.get(mime, ()), False)
+        # Everything is a kind of application/octet-stream; hex editors
+        # registered for it are not useful suggestions for other types
+        parents = [t for t in self.by_type
+                   if t != mime and t != 'application/octet-stream' and Gio.content_type_is_a(mime, t)]
+        for parent in parents:
+            # A parent's default stands in only when nothing handles the type itself
+            add_defaults(self.defaults.get(parent, []), not ranked)
+        for parent in parents:
+            add(self.by_type[parent], False)
+
+        result = [(self.apps_by_id[d], is_default) for d, is_default in ranked.items()]
+        self.resolved[mime] = result
+        return result
+
+
+class SearchProvider:
+    """Base class for non-app search result sources.
+
+    query() runs on a worker thread, at most one call per provider at a
+    time, and should poll cancellable.is_cancelled() in long loops.
+    Results arriving after budget_ms, or after the query text changed,
+    are discarded, so a slow provider never delays app results or the
+    next keystroke.
+
+    A result is a dict with 'title', 'subtitle', 'icon_name' (or 'app' to
+    show that app's icon) and 'action', a (kind, value) tuple handled by
+    AppLauncher.activate_result.
+    """
+
+    name = "provider"
+    budget_ms = 150
+    max_results = 5
+    min_query_length = 2
+
+    # Index updates compete with typing for the GIL; True starts them on hide
+    refresh_while_hidden = False
+
+    def __init__(self):
+        self.busy = False
+        self.pending = None
+
+    def maybe_refresh(self):
+        """Start updating the provider's index in the background if it may be stale"""
+
+    def query(self, text, cancellable):
+        raise NotImplementedError
+
+
+class CommandProvider(SearchProvider):
+    """Executables on $PATH matching the first word of the query"""
+
+    name = "commands"
+
+    def __init__(self):
+        super().__init__()
+        self.dir_mtimes = {}
+        self.commands = []
+
+    def _refresh(self):
+        path_dirs = [d for d in os.environ.get('PATH', '').split(':') if d]
+        mtimes = {}
+        for directory in path_dirs:
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+        if mtimes == self.dir_mtimes:
+            return
+
+        commands = set()
+        for directory in mtimes:
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file() and os.access(entry.path, os.X_OK):
+                                commands.add(entry.name)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        self.commands = sorted(commands)
+        self.dir_mtimes = mtimes
+
+    def query(self, text, cancellable):
+        self._refresh()
+        text = text.strip()
+        word, _, args = text.partition(' ')
+        if cancellable.is_cancelled():
+            return []
+
+        start = bisect.bisect_left(self.commands, word)
+        results = []
+        for command in self.commands[start:]:
+            if not command.startswith(word) or len(results) >= self.max_results:
+                break
+            line = f"{command} {args}".strip()
+            results.append({
+                'title': line,
+                'subtitle': "Run command",
+                'icon_name': "utilities-terminal",
+                'action': ('run', line),
+            })
+        return results
+
+
+class SortedTable:
+    """Read-only, memory-mapped table of (key, value) string records sorted by key.
+
+    Layout: magic, u32 record count, count + 1 native u32 offsets, then the
+    records, each utf-8 "key\\0value". UTF-8 byte order matches code point
+    order, so prefix lookups are a binary search straight over the mapping.
+    """
+
+    MAGIC = b"PLTABLE1"
+
+    def __init__(self, mapping):
+        (self.count,) = struct.unpack_from('<I', mapping, len(self.MAGIC))
+        offsets_start = len(self.MAGIC) + 4
+        self.data_start = offsets_start + 4 * (self.count + 1)
+        self.map = mapping
+        self.offsets = memoryview(mapping)[offsets_start:self.data_start].cast('I')
+
+    @classmethod
+    def open(cls, path):
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if mapping[:len(cls.MAGIC)] != cls.MAGIC:
+            mapping.close()
+            return None
+        return cls(mapping)
+
+    @classmethod
+    def write(cls, path, records):
+        """Atomically write (key, value) pairs that are already sorted by key"""
+        offsets = array('I', [0])
+        chunks = []
+        position = 0
+        for key, value in records:
+            chunk = key.encode() + b'\0' + value.encode()
+            chunks.append(chunk)
+            position += len(chunk)
+            offsets.append(position)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(struct.pack('<I', len(offsets) - 1))
+            f.write(offsets.tobytes())
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return self.count
+
+    def _raw(self, index):
+        return self.map[self.data_start + self.offsets[index]:self.data_start + self.offsets[index + 1]]
+
+    def key_at(self, index):
+        raw = self._raw(index)
+        return raw[:raw.find(b'\0')]
+
+    def record(self, index):
+        key, _, value = self._raw(index).partition(b'\0')
+        return key.decode(), value.decode()
+
+    def get(self, key):
+        """Value of an exact key, or None"""
+        encoded = key.encode()
+        index = bisect.bisect_left(range(self.count), encoded, key=self.key_at)
+        if index < self.count and self.key_at(index) == encoded:
+            return self.record(index)[1]
+        return None
+
+    def prefix_range(self, prefix):
+        """(start, end) record indexes of the keys starting with prefix"""
+        encoded = prefix.encode()
+        start = bisect.bisect_left(range(self.count), encoded, key=self.key_at)
+        end = bisect.bisect_right(range(self.count), encoded, lo=start,
+                                  key=lambda i: self.key_at(i)[:len(encoded)])
+        return start, end
+
+    def prefix(self, prefix, limit=None):
+        """Yield (index, key, value) for keys starting with prefix, in key order"""
+        encoded = prefix.encode()
+        index = bisect.bisect_left(range(self.count), encoded, key=self.key_at)
+        while index < self.count and (limit is None or limit > 0):
+            key, value = self.record(index)
+            if not key.startswith(prefix):
+                break
+            yield index, key, value
+            index += 1
+            if limit is not None:
+                limit -= 1
+
+
+def shell_history_files():
+    """(path, format) of the fish, bash and zsh history files that may exist"""
+    home = Path.home()
+    data_home = Path(os.environ.get('XDG_DATA_HOME') or home / ".local/share")
+    return [
+        (data_home / "fish" / "fish_history", 'fish'),
+        (Path(os.environ.get('HISTFILE') or home / ".bash_history"), 'bash'),
+        (home / ".zsh_history", 'zsh'),
+        (home / ".histfile", 'zsh'),
+    ]
+
+
+class OpenWithProvider(SearchProvider):
+    """Apps that can open a typed path (~/notes.md), extension (.svg) or MIME type.
+
+    Lookups go through the MimeIndex the launcher installs in self.index
+    whenever the catalog changes.
+    """
+
+    name = "open-with"
+
+    def __init__(self):
+        super().__init__()
+        self.index = MimeIndex()
+
+    def query(self, text, cancellable):
+        text = text.strip()
+        path = None
+        if text.startswith(('/', '~')):
+            path = os.path.expanduser(text)
+            if os.path.isdir(path):
+                mime = 'inode/directory'
+            else:
+                mime, _ = Gio.content_type_guess(os.path.basename(path), None)
+            if not os.path.exists(path):
+                path = None
+        elif text.startswith('.') and len(text) > 1 and ' ' not in text and '/' not in text:
+            mime, _ = Gio.content_type_guess("file" + text, None)
+        elif text in self.index.by_type:
+            mime = text
+        else:
+            return []
+
+        if not mime or Gio.content_type_is_unknown(mime):
+            return []
+
+        description = Gio.content_type_get_description(mime) or mime
+        results = []
+        for app, is_default in self.index.apps_for(mime)[:self.max_results]:
+            subtitle = description + (" · default" if is_default else "")
+            results.append({
+                'title': f"Open {os.path.basename(path)} with {app['name']}" if path else app['name'],
+                'subtitle': subtitle,
+                'app': app,
+                'action': ('open_with', (app['desktop_id'], path)),
+            })
+        return results
+
+
+class HistoryProvider(SearchProvider):
+    """Previously run shell commands, ranked by how often they were run.
+
+    Each history file is tail-parsed: only bytes appended since the stored
+    offset are read, and only up to the last complete record, so a
+    multi-megabyte history is read once and then followed incrementally.
+    A file that shrinks or is replaced (fish rewrites its history when
+    merging) is re-read from the start.
+    """
+
+    name = "history"
+    max_results = 3
+    # How often query() looks at the files for new lines
+    CHECK_SECONDS = 1.0
+
+    def __init__(self, files=None):
+        super().__init__()
+        self.files = files if files is not None else shell_history_files()
+        self.positions = {}   # path -> (inode, offset)
+        self.per_file = {}    # path -> {command: [count, last_time]}
+        self.commands = {}    # merged: command -> [count, last_time]
+        self.last_check = 0
+
+    def refresh(self):
+        for path, fmt in self.files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            inode, offset = self.positions.get(path, (None, 0))
+            if inode != st.st_ino or st.st_size < offset:
+                self._forget(path)
+                offset = 0
+            if st.st_size == offset:
+                continue
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            consumed = self._parse(path, fmt, data)
+            self.positions[path] = (st.st_ino, offset + consumed)
+
+    def _forget(self, path):
+        for command, (count, _) in self.per_file.pop(path, {}).items():
+            merged = self.commands.get(command)
+            if merged:
+                merged[0] -= count
+                if merged[0] <= 0:
+                    del self.commands[command]
+
+    def _add(self, path, command, when):
+        command = command.strip()
+        if not command:
+            return
+        for table in (self.per_file.setdefault(path, {}), self.commands):
+            entry = table.setdefault(command, [0, 0])
+            entry[0] += 1
+            entry[1] = max(entry[1], when)
+
+    def _parse(self, path, fmt, data):
+        """Parse complete records in data; return the number of bytes consumed"""
+        end = data.rfind(b'\n') + 1
+        if fmt == 'zsh':
+            # A trailing backslash continues the command on the next line
+            while end > 1 and data[end - 2:end - 1] == b'\\':
+                end = data.rfind(b'\n', 0, end - 1) + 1
+        if end <= 0:
+            return 0
+        chunk = data[:end]
+
+        if fmt == 'fish':
+            command = None
+            for line in chunk.decode(errors='replace').splitlines():
+                if line.startswith('- cmd: '):
+                    if command is not None:
+                        self._add(path, command, 0)
+                    command = self._unescape_fish(line[7:])
+                elif line.startswith('  when: ') and command is not None:
+                    try:
+                        when = int(line[8:])
+                    except ValueError:
+                        when = 0
+                    self._add(path, command, when)
+                    command = None
+            if command is not None:
+                self._add(path, command, 0)
+
+        elif fmt == 'zsh':
+            text = self._unmetafy(chunk).decode(errors='replace')
+            for record in re.split(r'(?<!\\)\n', text):
+                when = 0
+                if record.startswith(': ') and ';' in record:
+                    meta, record = record.split(';', 1)
+                    try:
+                        when = int(meta[2:].split(':')[0])
+                    except ValueError:
+                        pass
+                self._add(path, record.replace('\\\n', '\n'), when)
+
+        else:
+            when = 0
+            for line in chunk.decode(errors='replace').splitlines():
+                if line.startswith('#') and line[1:].isdigit():
+                    when = int(line[1:])
+                    continue
+                self._add(path, line, when)
+
+        return end
+
+    @staticmethod
+    def _unescape_fish(text):
+        out = []
+        chars = iter(text)
+        for c in chars:
+            if c == '\\':
+                nxt = next(chars, '')
+                out.append('\n' if nxt == 'n' else nxt)
+            else:
+                out.append(c)
+        return ''.join(out)
+
+    @staticmethod
+    def _unmetafy(data):
+        """Undo zsh's 0x83 escaping of bytes it treats specially"""
+        if b'\x83' not in data:
+            return data
+        out = bytearray()
+        it = iter(data)
+        for byte in it:
+            if byte == 0x83:
+                byte = next(it, 0x20) ^ 0x20
+            out.append(byte)
+        return bytes(out)
+
+    def query(self, text, cancellable):
+        now = time.monotonic()
+        if now - self.last_check >= self.CHECK_SECONDS:
+            self.last_check = now
+            self.refresh()
+
+        needle = text.strip().lower()
+        matches = []
+        for command, (count, when) in self.commands.items():
+            lower = command.lower()
+            if needle in lower:
+                matches.append((not lower.startswith(needle), -count, -when, command))
+        if cancellable.is_cancelled():
+            return []
+        matches.sort()
+
+        results = []
+        for _, count, _, command in matches[:self.max_results]:
+            results.append({
+                'title': command.splitlines()[0],
+                'subtitle': f"History · run {-count}×",
+                'icon_name': "document-open-recent",
+                'action': ('run', command),
+            })
+        return results
+
+
+class RecentFilesProvider(SearchProvider):
+    """Recently used files from recently-used.xbel, newest first.
+
+    The file is read with expat on a background thread without building
+    any element tree, keeping only the newest max_entries in a heap, so a
+    many-megabyte history costs neither main-thread time nor memory
+    proportional to its size. It is re-read only when its mtime changes.
+    """
+
+    name = "recent"
+    MIME_TYPE_ELEMENT = "http://www.freedesktop.org/standards/shared-mime-info mime-type"
+
+    def __init__(self, path=None, max_entries=500):
+        super().__init__()
+        data_home = os.environ.get('XDG_DATA_HOME') or Path.home() / ".local/share"
+        self.path = str(path or Path(data_home) / "recently-used.xbel")
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = []  # (lowercase name, path, mime type), newest first
+        self.mtime = None
+        self.refreshing = False
+
+    def maybe_refresh(self):
+        """Re-parse in the background if the file changed since the last parse"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        with self.lock:
+            if mtime == self.mtime or self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._refresh, args=(mtime,), daemon=True).start()
+
+    def _refresh(self, mtime):
+        try:
+            self.entries = self.parse()
+        except (OSError, xml.parsers.expat.ExpatError) as e:
+            print(f"Failed to read {self.path}: {e}")
+        finally:
+            # A broken file is not retried until it is rewritten
+            self.mtime = mtime
+            self.refreshing = False
+
+    def parse(self):
+        """Newest max_entries local files, as (lowercase name, path, mime type)"""
+        newest = []
+        serial = itertools.count()  # later entries win timestamp ties
+        current = None  # [timestamp, serial, href, mime type] of the open bookmark
+
+        def keep(entry):
+            if len(newest) < self.max_entries:
+                heapq.heappush(newest, entry)
+            else:
+                heapq.heappushpop(newest, entry)
+
+        def start_element(name, attrs):
+            nonlocal current
+            if name == 'bookmark':
+                if current is not None:
+                    keep(current)
+                href = attrs.get('href', '')
+                # ISO 8601 in UTC; seconds are precise enough to order by
+                stamp = (attrs.get('modified') or attrs.get('visited') or attrs.get('added') or '')[:19]
+                current = [stamp, next(serial), href, None] if href.startswith('file://') else None
+            elif name == self.MIME_TYPE_ELEMENT and current is not None:
+                current[3] = attrs.get('type')
+
+        parser = xml.parsers.expat.ParserCreate(namespace_separator=' ')
+        parser.StartElementHandler = start_element
+        with open(self.path, 'rb') as f:
+            parser.ParseFile(f)
+        if current is not None:
+            keep(current)
+
+        entries = []
+        for _, _, href, mime in sorted(newest, reverse=True):
+            path = urllib.parse.unquote(urllib.parse.urlsplit(href).path)
+            entries.append((os.path.basename(path).lower(), path, mime))
+        return entries
+
+    def query(self, text, cancellable):
+        self.maybe_refresh()
+        terms = text.lower().split()
+        home = str(Path.home())
+        results = []
+        for name, path, mime in self.entries:
+            if not all(term in name for term in terms) or not os.path.exists(path):
+                continue
+            parent = os.path.dirname(path)
+            if parent == home or parent.startswith(home + os.sep):
+                parent = "~" + parent[len(home):]
+            results.append({
+                'title': os.path.basename(path),
+                'subtitle': f"Recent · {parent}",
+                'icon_name': Gio.content_type_get_generic_icon_name(mime) if mime else "text-x-generic",
+                'action': ('open', path),
+            })
+            if len(results) >= self.max_results or cancellable.is_cancelled():
+                break
+        return results
+
+
+class FileIndexProvider(SearchProvider):
+    """Locate-style index of the home directory.
+
+    The main index is three SortedTables in FILE_INDEX_DIR: relative paths
+    (the record position is the path id), name tokens -> path id, and
+    directory -> mtime. Token keys carry a rank suffix, so the paths of
+    each token are stored best first and a query reads only as many
+    records as it shows. A sweep stats every known directory and re-lists
+    only those whose mtime changed; what changed goes to three small delta
+    tables (path -> kind or '-' if removed, tokens -> path, directory ->
+    mtime or '-') that queries read beside the main ones, and which are
+    merged into a rewritten main index once they grow past
+    FILE_INDEX_DELTA_MAX records. Hidden entries and other filesystems
+    are skipped.
+    """
+
+    name = "files"
+    min_query_length = 3
+    refresh_while_hidden = True
+    TABLES = ('paths', 'tokens', 'dirs', 'delta-paths', 'delta-tokens', 'delta-dirs')
+
+    def __init__(self, root=None, index_dir=FILE_INDEX_DIR):
+        super().__init__()
+        self.root = str(root or Path.home())
+        self.index_dir = Path(index_dir)
+        self.lock = threading.Lock()
+        self.tables = self._open_tables()
+        self.last_sweep = 0
+        self.sweeping = False
+
+    def _open_tables(self):
+        return {name: SortedTable.open(self.index_dir / f"{name}.idx") for name in self.TABLES}
+
+    def maybe_refresh(self):
+        """Start a background sweep if the last one is old enough"""
+        if self.sweeping or (self.tables['paths'] and
+                             time.monotonic() - self.last_sweep < FILE_INDEX_SWEEP_SECONDS):
+            return
+        self.sweeping = True
+        threading.Thread(target=self._sweep, daemon=True).start()
+
+    def _sweep(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"File index sweep failed: {e}")
+        finally:
+            self.last_sweep = time.monotonic()
+            self.sweeping = False
+
+    def refresh(self):
+        """Bring the index up to date with the tree; True if anything was written"""
+        with self.lock:
+            tables = self.tables
+        try:
+            root_dev = os.stat(self.root).st_dev
+        except OSError:
+            return False
+
+        paths, dirs = tables['paths'], tables['dirs']
+        if paths is None or dirs is None or tables['tokens'] is None:
+            # Left by the index format before ranked tokens
+            (self.index_dir / "names.idx").unlink(missing_ok=True)
+            entries, dir_mtimes = [], []
+            self._walk('', root_dev, entries, dir_mtimes)
+            self._write_main(entries, dir_mtimes)
+            return True
+
+        delta_paths = dict(self._records(tables['delta-paths']))
+        delta_dirs = dict(self._records(tables['delta-dirs']))
+
+        def add(rel, kind):
+            if paths.get(rel) == kind:
+                delta_paths.pop(rel, None)
+            else:
+                delta_paths[rel] = kind
+
+        def set_mtime(rel, mtime):
+            if dirs.get(rel) == mtime:
+                delta_dirs.pop(rel, None)
+            else:
+                delta_dirs[rel] = mtime
+
+        def remove(rel, is_dir):
+            for delta, table in ((delta_paths, paths), (delta_dirs, dirs)):
+                if table is dirs and not is_dir:
+                    continue
+                targets = [rel]
+                if is_dir:
+                    targets += [r for r in delta if r.startswith(rel + '/')]
+                    targets += [r for _, r, _ in table.prefix(rel + '/')]
+                for target in targets:
+                    if table.get(target) is None:
+                        delta.pop(target, None)
+                    else:
+                        delta[target] = '-'
+
+        known = [(rel, mtime) for rel, mtime in self._records(dirs) if rel not in delta_dirs]
+        known += [(rel, mtime) for rel, mtime in delta_dirs.items() if mtime != '-']
+        changed = False
+        for rel, known_mtime in known:
+            full = os.path.join(self.root, rel) if rel else self.root
+            try:
+                st = os.stat(full, follow_symlinks=False)
+            except OSError:
+                # Gone; the parent's listing changed too and drops it
+                continue
+            mtime = str(st.st_mtime_ns)
+            if known_mtime == mtime:
+                continue
+            if st.st_dev != root_dev:
+                continue
+            kids = self._list(full)
+            if kids is None:
+                continue
+
+            changed = True
+            set_mtime(rel, mtime)
+            old_kids = self._children(paths, rel, delta_paths)
+            for name, kind in old_kids.items():
+                if kids.get(name) != kind:
+                    remove(f"{rel}/{name}" if rel else name, kind == 'd')
+            for name, kind in kids.items():
+                if old_kids.get(name) == kind:
+                    continue
+                child = f"{rel}/{name}" if rel else name
+                add(child, kind)
+                if kind == 'd':
+                    entries, dir_mtimes = [], []
+                    self._walk(child, root_dev, entries, dir_mtimes)
+                    for entry in entries:
+                        add(*entry)
+                    for entry in dir_mtimes:
+                        set_mtime(*entry)
+
+        if not changed:
+            return False
+        if len(delta_paths) + len(delta_dirs) > FILE_INDEX_DELTA_MAX:
+            entries = [(rel, kind) for rel, kind in self._records(paths) if rel not in delta_paths]
+            entries += [(rel, kind) for rel, kind in delta_paths.items() if kind != '-']
+            dir_mtimes = [(rel, mtime) for rel, mtime in self._records(dirs) if rel not in delta_dirs]
+            dir_mtimes += [(rel, mtime) for rel, mtime in delta_dirs.items() if mtime != '-']
+            self._write_main(entries, dir_mtimes)
+            return True
+
+        self._write_delta(delta_paths, delta_dirs)
+        return True
+
+    @staticmethod
+    def _records(table):
+        if table is None:
+            return
+        for i in range(len(table)):
+            yield table.record(i)
+
+    @staticmethod
+    def _list(full):
+        """{name: 'd' or 'f'} of a directory's visible entries, or None if unreadable"""
+        kids = {}
+        try:
+            with os.scandir(full) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        entry.name.encode()
+                        kids[entry.name] = 'd' if entry.is_dir(follow_symlinks=False) else 'f'
+                    except (OSError, UnicodeEncodeError):
+                        continue
+        except OSError:
+            return None
+        return kids
+
+    def _walk(self, rel, root_dev, entries, dir_mtimes):
+        """Append every path below rel, and the mtimes of rel and its subdirectories"""
+        stack = [rel]
+        while stack and len(entries) < FILE_INDEX_MAX_ENTRIES:
+            rel = stack.pop()
+            full = os.path.join(self.root, rel) if rel else self.root
+            try:
+                st = os.stat(full, follow_symlinks=False)
+            except OSError:
+                continue
+            if st.st_dev != root_dev:
+                continue
+            kids = self._list(full)
+            if kids is None:
+                continue
+            dir_mtimes.append((rel, str(st.st_mtime_ns)))
+            for name, kind in kids.items():
+                child = f"{rel}/{name}" if rel else name
+                entries.append((child, kind))
+                if kind == 'd':
+                    stack.append(child)
+
+    @staticmethod
+    def _children(paths, rel, delta_paths):
+        """{name: kind} of rel's children in the index, without reading its subtrees"""
+        prefix = f"{rel}/" if rel else ''
+        kids = {}
+        index = bisect.bisect_left(range(len(paths)), prefix.encode(), key=paths.key_at)
+        while index < len(paths):
+            key, kind = paths.record(index)
+            if not key.startswith(prefix):
+                break
+            name, slash, _ = key[len(prefix):].partition('/')
+            if slash:
+                # Skip the subtree: '0' is the character after '/'
+                index = bisect.bisect_left(range(len(paths)), (prefix + name + '0').encode(),
+                                           lo=index, key=paths.key_at)
+                continue
+            kids[name] = kind
+            index += 1
+        for key, kind in delta_paths.items():
+            if key.startswith(prefix) and '/' not in key[len(prefix):]:
+                if kind == '-':
+                    kids.pop(key[len(prefix):], None)
+                else:
+                    kids[key[len(prefix):]] = kind
+        return kids
+
+    def _write_main(self, entries, dir_mtimes):
+        """Rewrite the main tables from sorted entries, emptying the delta"""
+        entries.sort()
+        dir_mtimes.sort()
+        tokens = []
+        for path_id, (rel, _) in enumerate(entries):
+            # Padded so equally ranked paths stay in path order
+            tokens += self._token_records(rel, f"{path_id:07d}")
+        tokens.sort()
+        SortedTable.write(self.index_dir / "paths.idx", entries)
+        SortedTable.write(self.index_dir / "tokens.idx", tokens)
+        SortedTable.write(self.index_dir / "dirs.idx", dir_mtimes)
+        self._write_delta({}, {})
+
+    def _write_delta(self, delta_paths, delta_dirs):
+        tokens = []
+        for rel, kind in delta_paths.items():
+            if kind != '-':
+                tokens += self._token_records(rel, rel)
+        SortedTable.write(self.index_dir / "delta-paths.idx", sorted(delta_paths.items()))
+        SortedTable.write(self.index_dir / "delta-tokens.idx", sorted(tokens))
+        SortedTable.write(self.index_dir / "delta-dirs.idx", sorted(delta_dirs.items()))
+        with self.lock:
+            self.tables = self._open_tables()
+
+    @staticmethod
+    def _tokens(name):
+        name = name.lower()
+        tokens = {name}
+        tokens.update(t for t in re.split(r'[^0-9a-z]+', name) if len(t) >= 2)
+        return tokens
+
+    @classmethod
+    def _token_records(cls, rel, value):
+        """Token records of a path; "\\x01" and a rank follow the token in the key"""
+        name = rel.rpartition('/')[2].lower()
+        depth = min(rel.count('/'), 0xfff)
+        length = min(len(rel), 0xffff)
+        records = []
+        for token in cls._tokens(name):
+            # The whole name, then names starting with the token, then the
+            # rest; shallower and then shorter paths first within each
+            place = 0 if token == name else 1 if name.startswith(token) else 2
+            records.append((f"{token}\x01{place}{depth:03x}{length:04x}", value))
+        return records
+
+    def query(self, text, cancellable):
+        with self.lock:
+            tables = self.tables
+        paths, tokens = tables['paths'], tables['tokens']
+        if paths is None or tokens is None:
+            return []
+        delta_paths = tables['delta-paths']
+
+        terms = text.lower().split()
+        if not terms:
+            return []
+        # The last term drives the index lookup, the others filter the path
+        # ("doc notes" finds notes.txt under Documents)
+        term = terms[-1]
+
+        def main_hits():
+            for _, key, path_id in tokens.prefix(term):
+                rel, kind = paths.record(int(path_id))
+                # Changed or removed since the last merge; the delta has it
+                if delta_paths is None or delta_paths.get(rel) is None:
+                    yield key, rel, kind
+
+        def delta_hits():
+            if tables['delta-tokens'] is not None:
+                for _, key, rel in tables['delta-tokens'].prefix(term):
+                    yield key, rel, delta_paths.get(rel)
+
+        # "term\x01..." keys sort before longer tokens, so the exact token's
+        # paths come first, best first, followed by completions of the term
+        results = []
+        seen = set()
+        for scanned, (_, rel, kind) in enumerate(heapq.merge(main_hits(), delta_hits())):
+            if scanned % 256 == 0 and cancellable.is_cancelled():
+                return []
+            if rel in seen:
+                continue
+            seen.add(rel)
+            if not all(t in rel.lower() for t in terms[:-1]):
+                continue
+            parent, _, name = rel.rpartition('/')
+            results.append({
+                'title': name,
+                'subtitle': "~/" + parent if parent else "~",
+                'icon_name': "folder" if kind == 'd' else "text-x-generic",
+                'action': ('open', os.path.join(self.root, rel)),
+            })
+            if len(results) >= self.max_results:
+                break
+        return results
+
+
+def browser_sources():
+    """(kind, path) of the Firefox and Chromium-family databases that exist"""
+    home = Path.home()
+    sources = []
+    for firefox_dir in (home / ".mozilla/firefox",
+                        home / ".var/app/org.mozilla.firefox/.mozilla/firefox"):
+        for places in sorted(firefox_dir.glob("*/places.sqlite")):
+            sources.append(('firefox', str(places)))
+    for browser in ("chromium", "google-chrome", "BraveSoftware/Brave-Browser",
+                    "microsoft-edge", "vivaldi"):
+        for profile in sorted((home / ".config" / browser).glob("*/Preferences")):
+            for kind, name in (('chromium-history', "History"), ('chromium-bookmarks', "Bookmarks")):
+                if (profile.parent / name).exists():
+                    sources.append((kind, str(profile.parent / name)))
+    return sources
+
+
+class BookmarkProvider(SearchProvider):
+    """Browser bookmarks and history, answered from a local full-text index.
+
+    Browsers keep their databases locked while running, so each source is
+    copied (with its -wal/-journal) and read from the copy, and only when
+    its mtime or size changed. Rows go into an FTS5 table in index_path,
+    or a plain table searched with LIKE where SQLite lacks FTS5. sources
+    is a list of (kind, path) with kind 'firefox' (places.sqlite),
+    'chromium-history' or 'chromium-bookmarks'.
+    """
+
+    name = "bookmarks"
+    min_query_length = 3
+
+    def __init__(self, sources=None, index_path=BOOKMARK_INDEX_FILE):
+        super().__init__()
+        self.sources = sources
+        self.index_path = Path(index_path)
+        self.lock = threading.Lock()
+        self.last_refresh = 0
+        self.refreshing = False
+        self.db = None
+        self.fts = False
+
+    def _connect(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.index_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, stamp TEXT)")
+        try:
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5("
+                       "title, url, source UNINDEXED, bookmark UNINDEXED, score UNINDEXED, "
+                       "prefix='2 3')")
+        except sqlite3.OperationalError:
+            db.execute("CREATE TABLE IF NOT EXISTS entries "
+                       "(title TEXT, url TEXT, source TEXT, bookmark INTEGER, score REAL)")
+        schema = db.execute("SELECT sql FROM sqlite_master WHERE name = 'entries'").fetchone()[0]
+        db.commit()
+        return db, 'fts5' in schema.lower()
+
+    def maybe_refresh(self):
+        """Re-index changed sources in the background if the last check is old enough"""
+        with self.lock:
+            if self.refreshing or (self.last_refresh and
+                                   time.monotonic() - self.last_refresh < BOOKMARK_REFRESH_SECONDS):
+                return
+            self.refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Bookmark index refresh failed: {e}")
+        finally:
+            self.last_refresh = time.monotonic()
+            self.refreshing = False
+
+    def refresh(self):
+        """Re-read every source whose files changed; returns the number re-read"""
+        sources = self.sources if self.sources is not None else browser_sources()
+        db, _ = self._connect()
+        try:
+            known = dict(db.execute("SELECT path, stamp FROM sources"))
+            for path in set(known) - {path for _, path in sources}:
+                with db:
+                    db.execute("DELETE FROM entries WHERE source = ?", (path,))
+                    db.execute("DELETE FROM sources WHERE path = ?", (path,))
+
+            updated = 0
+            for kind, path in sources:
+                stamp = self._stamp(path)
+                if stamp is None or known.get(path) == stamp:
+                    continue
+                try:
+                    rows = self._read_source(kind, path)
+                except (OSError, ValueError, sqlite3.Error) as e:
+                    print(f"Failed to read {path}: {e}")
+                    continue
+                # Frecency and visit counts differ in scale; rank within each source
+                top = max((score or 0 for _, _, _, score in rows), default=0) or 1
+                with db:
+                    db.execute("DELETE FROM entries WHERE source = ?", (path,))
+                    db.executemany(
+                        "INSERT INTO entries (title, url, source, bookmark, score) VALUES (?, ?, ?, ?, ?)",
+                        ((title or '', url, path, bookmark, (score or 0) / top)
+                         for url, title, bookmark, score in rows))
+                    db.execute("INSERT OR REPLACE INTO sources (path, stamp) VALUES (?, ?)", (path, stamp))
+                updated += 1
+            return updated
+        finally:
+            db.close()
+
+    @staticmethod
+    def _stamp(path):
+        parts = []
+        for suffix in ('', '-wal', '-journal'):
+            try:
+                st = os.stat(path + suffix)
+            except OSError:
+                if not suffix:
+                    return None
+                continue
+            parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+        return ' '.join(parts)
+
+    def _read_source(self, kind, path):
+        """[(url, title, is_bookmark, score)] from one source"""
+        if kind == 'chromium-bookmarks':
+            with open(path, encoding='utf-8') as f:
+                roots = json.load(f).get('roots', {})
+            rows = []
+            stack = [node for node in roots.values() if isinstance(node, dict)]
+            while stack:
+                node = stack.pop()
+                if node.get('type') == 'url' and node.get('url'):
+                    rows.append((node['url'], node.get('name'), 1, 0))
+                stack.extend(node.get('children', ()))
+            return rows
+
+        if kind == 'firefox':
+            sql = (
+                "SELECT p.url, COALESCE(b.title, p.title), 1, p.frecency"
+                " FROM moz_bookmarks b JOIN moz_places p ON p.id = b.fk"
+                " WHERE b.type = 1 AND p.url NOT LIKE 'place:%'"
+                " UNION ALL SELECT * FROM ("
+                "  SELECT url, title, 0, frecency FROM moz_places"
+                "  WHERE visit_count > 0 AND hidden = 0"
+                "  AND id NOT IN (SELECT fk FROM moz_bookmarks WHERE fk IS NOT NULL)"
+                "  ORDER BY frecency DESC LIMIT ?)"
+            )
+        elif kind == 'chromium-history':
+            sql = ("SELECT url, title, 0, visit_count FROM urls WHERE hidden = 0"
+                   " ORDER BY visit_count DESC, last_visit_time DESC LIMIT ?")
+        else:
+            raise ValueError(f"unknown source kind {kind!r}")
+
+        # Read a private copy: the browser holds a lock on the original
+        with tempfile.TemporaryDirectory(dir=self.index_path.parent) as tmp:
+            copy = os.path.join(tmp, os.path.basename(path))
+            for suffix in ('', '-wal', '-journal'):
+                if os.path.exists(path + suffix):
+                    shutil.copyfile(path + suffix, copy + suffix)
+            db = sqlite3.connect(copy)
+            try:
+                return db.execute(sql, (BOOKMARK_HISTORY_LIMIT,)).fetchall()
+            finally:
+                db.close()
+
+    def query(self, text, cancellable):
+        self.maybe_refresh()
+        if self.db is None:
+            self.db, self.fts = self._connect()
+
+        terms = text.lower().split()
+        limit = self.max_results * 4
+        if self.fts:
+            match = ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+            sql = ("SELECT title, url, bookmark FROM entries WHERE entries MATCH ?"
+                   " ORDER BY bookmark DESC, score DESC LIMIT ?")
+            params = (match, limit)
+        else:
+            where = ' AND '.join(["(title LIKE ? OR url LIKE ?)"] * len(terms))
+            sql = (f"SELECT title, url, bookmark FROM entries WHERE {where}"
+                   " ORDER BY bookmark DESC, score DESC LIMIT ?")
+            params = tuple(p for term in terms for p in (f"%{term}%",) * 2) + (limit,)
+
+        # Abort the statement as soon as the query is superseded or over budget
+        self.db.set_progress_handler(cancellable.is_cancelled, 1000)
+        try:
+            rows = self.db.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            return []
+        finally:
+            self.db.set_progress_handler(None, 0)
+
+        results = []
+        seen = set()
+        for title, url, bookmark in rows:
+            if url in seen:
+                continue
+            seen.add(url)
+            host = urllib.parse.urlsplit(url).hostname or url
+            results.append({
+                'title': title or url,
+                'subtitle': f"{'Bookmark' if bookmark else 'History'} · {host}",
+                'icon_name': "user-bookmarks" if bookmark else "web-browser",
+                'action': ('open', url),
+            })
+            if len(results) >= self.max_results:
+                break
+        return results
+
+
+class UnicodeProvider(SearchProvider):
+    """Characters and emoji by name, copied to the clipboard on activation.
+
+    Names are never loaded into Python dicts: a SortedTable of
+    (name word, code point) pairs is generated once per Unicode version
+    on a background thread, memory-mapped, and queried by word prefix;
+    unicodedata.name() fills in the full names of the few hits.
+    """
+
+    name = "unicode"
+    min_query_length = 3
+
+    def __init__(self, index_file=UNICODE_INDEX_FILE):
+        super().__init__()
+        self.index_file = Path(index_file)
+        self.table = SortedTable.open(self.index_file)
+        self.building = False
+
+    def ensure_index(self):
+        if self.table is None and not self.building:
+            self.building = True
+            threading.Thread(target=self._build, daemon=True).start()
+
+    def _build(self):
+        records = []
+        for cp in range(0x110000):
+            if 0xD800 <= cp <= 0xDFFF:
+                continue
+            name = unicodedata.name(chr(cp), '')
+            # Skip characters named by their code point (CJK ideographs etc.)
+            if not name or name.endswith(f"-{cp:X}"):
+                continue
+            # Zero-padded so a word's code points sort numerically
+            value = f"{cp:06X}"
+            for word in set(re.split(r'[ -]+', name.lower())):
+                if word:
+                    records.append((word, value))
+        records.sort()
+        try:
+            SortedTable.write(self.index_file, records)
+            self.table = SortedTable.open(self.index_file)
+        except OSError as e:
+            print(f"Failed to write unicode index: {e}")
+        self.building = False
+
+    def query(self, text, cancellable):
+        table = self.table
+        if table is None:
+            self.ensure_index()
+            return []
+
+        terms = text.lower().split()
+        if not terms:
+            return []
+        # Walk the rarest term's whole range; the other terms filter it
+        ranges = [table.prefix_range(term) for term in terms]
+        start, end = min(ranges, key=lambda r: r[1] - r[0])
+        matches = []
+        seen = set()
+        for index in range(start, end):
+            if index % 512 == 0 and cancellable.is_cancelled():
+                return []
+            value = table.record(index)[1]
+            if value in seen:
+                continue
+            seen.add(value)
+            char = chr(int(value, 16))
+            name = unicodedata.name(char, '').lower()
+            words = re.split(r'[ -]+', name)
+            if not all(any(w.startswith(t) for w in words) for t in terms):
+                continue
+            exact = sum(t in words for t in terms)
+            # After an exact name, lower code points are the common characters
+            rank = (-exact, name != ' '.join(terms), int(value, 16))
+            matches.append((rank, char, name))
+        matches.sort()
+
+        results = []
+        for _, char, name in matches[:self.max_results]:
+            results.append({
+                'title': name.title(),
+                'subtitle': f"U+{ord(char):04X} · Copy to clipboard",
+                'glyph': char,
+                'action': ('copy', char),
+            })
+        return results
+
+
+class NiriWindowProvider:
+    """Open windows by app-id, kept current from niri's IPC event stream.
+
+    A daemon thread holds an EventStream connection to socket_path and
+    updates the window map under a lock; nothing is dispatched to the
+    main loop. Focus requests use a short-lived second connection. Any
+    socket speaking niri's line-delimited JSON protocol will do, which
+    makes it easy to run against a fake server.
+    """
+
+    MAX_RECONNECTS = 5
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.lock = threading.Lock()
+        self.windows = {}      # window id -> niri window object
+        self.focus_order = {}  # window id -> focus counter, higher is more recent
+        self.focus_counter = 0
+        self.connected = False
+
+    def start(self):
+        threading.Thread(target=self._event_loop, daemon=True).start()
+
+    def _event_loop(self):
+        failures = 0
+        while failures < self.MAX_RECONNECTS:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.socket_path)
+                    sock.sendall(b'"EventStream"\n')
+                    stream = sock.makefile('r', encoding='utf-8')
+                    if 'Ok' not in json.loads(stream.readline()):
+                        return
+                    self.connected = True
+                    failures = 0
+                    for line in stream:
+                        self.handle_event(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            self.connected = False
+            with self.lock:
+                self.windows = {}
+                self.focus_order = {}
+            failures += 1
+            time.sleep(2 ** failures)
+
+    def handle_event(self, event):
+        with self.lock:
+            if 'WindowsChanged' in event:
+                self.windows = {w['id']: w for w in event['WindowsChanged']['windows']}
+                for window in self.windows.values():
+                    if window.get('is_focused'):
+                        self._mark_focused(window['id'])
+            elif 'WindowOpenedOrChanged' in event:
+                window = event['WindowOpenedOrChanged']['window']
+                self.windows[window['id']] = window
+                if window.get('is_focused'):
+                    self._mark_focused(window['id'])
+            elif 'WindowClosed' in event:
+                self.windows.pop(event['WindowClosed']['id'], None)
+                self.focus_order.pop(event['WindowClosed']['id'], None)
+            elif 'WindowFocusChanged' in event:
+                window_id = event['WindowFocusChanged']['id']
+                if window_id is not None:
+                    self._mark_focused(window_id)
+
+    def _mark_focused(self, window_id):
+        self.focus_counter += 1
+        self.focus_order[window_id] = self.focus_counter
+
+    def find_window(self, app_ids):
+        """Most recently focused window whose app-id is in app_ids (lowercase)"""
+        with self.lock:
+            matches = [w for w in self.windows.values()
+                       if (w.get('app_id') or '').lower() in app_ids]
+            if not matches:
+                return None
+            return max(matches, key=lambda w: self.focus_order.get(w['id'], 0))
+
+    def focus(self, window_id):
+        request = json.dumps({'Action': {'FocusWindow': {'id': window_id}}}) + "\n"
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.5)
+                sock.connect(self.socket_path)
+                sock.sendall(request.encode())
+                reply = json.loads(sock.makefile('r', encoding='utf-8').readline())
+        except (OSError, ValueError):
+            return False
+        return 'Ok' in reply
+
+
+def elf_dependencies(path):
+    """DT_NEEDED names and RUNPATH/RPATH entries of a 64-bit little-endian ELF"""
+    with open(path, 'rb') as f:
+        header = f.read(64)
+        if len(header) < 64 or header[:4] != b'\x7fELF' or header[4] != 2 or header[5] != 1:
+            return [], []
+        (phoff,) = struct.unpack_from('<Q', header, 0x20)
+        phentsize, phnum = struct.unpack_from('<HH', header, 0x36)
+        f.seek(phoff)
+        program_headers = f.read(phentsize * phnum)
+
+        dynamic = None
+        loads = []
+        for i in range(phnum):
+            p_type, _, p_offset, p_vaddr, _, p_filesz = struct.unpack_from(
+                '<IIQQQQ', program_headers, i * phentsize)
+            if p_type == 2:    # PT_DYNAMIC
+                dynamic = (p_offset, p_filesz)
+            elif p_type == 1:  # PT_LOAD
+                loads.append((p_vaddr, p_offset, p_filesz))
+        if dynamic is None:
+            return [], []
+
+        f.seek(dynamic[0])
+        dyn = f.read(dynamic[1])
+        needed, runpaths = [], []
+        strtab = strsz = None
+        for i in range(0, len(dyn) - 15, 16):
+            tag, value = struct.unpack_from('<qQ', dyn, i)
+            if tag == 0:
+                break
+            if tag == 1:
+                needed.append(value)
+            elif tag in (15, 29):  # DT_RPATH, DT_RUNPATH
+                runpaths.append(value)
+            elif tag == 5:
+                strtab = value
+            elif tag == 10:
+                strsz = value
+        if strtab is None or strsz is None:
+            return [], []
+
+        # DT_STRTAB is a virtual address; map it through the PT_LOAD segments
+        for vaddr, offset, filesz in loads:
+            if vaddr <= strtab < vaddr + filesz:
+                f.seek(strtab - vaddr + offset)
+                strings = f.read(strsz)
+                break
+        else:
+            return [], []
+
+    def string_at(offset):
+        end = strings.find(b'\0', offset)
+        return strings[offset:end if end >= 0 else None].decode(errors='replace')
+
+    origin = os.path.dirname(path)
+    dirs = []
+    for value in runpaths:
+        for entry in string_at(value).split(':'):
+            if entry:
+                dirs.append(entry.replace('$ORIGIN', origin).replace('${ORIGIN}', origin))
+    return [string_at(value) for value in needed], dirs
+
+
+class PagePrefetcher:
+    """Warm the page cache for the files behind likely launches.
+
+    A worker thread resolves each app's executable, a script's
+    interpreter and, for ELF binaries, the shared libraries they need,
+    then calls posix_fadvise(WILLNEED) on them, up to budget_bytes per
+    round. Requests coalesce: only the latest waits while one is being
+    processed. stats records what was warmed and how often the app that
+    was launched had been prefetched.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget = budget_bytes
+        self.condition = threading.Condition()
+        self.pending = None
+        self.thread = None
+        self.resolved = {}    # executable -> [(path, size)]
+        self.warmed = {}      # path -> monotonic time of the last advise
+        self.prefetched = {}  # desktop_id -> monotonic time
+        self.stats = {
+            'rounds': 0, 'files': 0, 'bytes': 0, 'advise_ms': 0.0,
+            'launches': 0, 'prefetched_launches': 0,
+        }
+
+    def request(self, apps):
+        """Prefetch apps (most likely first) in the background"""
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        targets = [(app['desktop_id'], app['desktop_path'], app['app_info']) for app in apps]
+        with self.condition:
+            self.pending = targets
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._worker, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def record_launch(self, desktop_id):
+        with self.condition:
+            self.stats['launches'] += 1
+            warmed_at = self.prefetched.get(desktop_id)
+            if warmed_at is not None and time.monotonic() - warmed_at < PREFETCH_REWARM_SECONDS:
+                self.stats['prefetched_launches'] += 1
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                targets, self.pending = self.pending, None
+            try:
+                self._prefetch(targets)
+            except Exception as e:
+                print(f"Prefetch failed: {e}")
+
+    def _prefetch(self, targets):
+        now = time.monotonic()
+        remaining = self.budget
+        files = bytes_advised = 0
+        start = time.perf_counter()
+        for desktop_id, desktop_path, app_info in targets:
+            executable = self.executable_for(desktop_path, app_info)
+            if executable is None:
+                continue
+            if executable not in self.resolved:
+                self.resolved[executable] = self.files_for(executable)
+            for path, size in self.resolved[executable]:
+                if now - self.warmed.get(path, -PREFETCH_REWARM_SECONDS) < PREFETCH_REWARM_SECONDS:
+                    continue
+                if size > remaining:
+                    break
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                    finally:
+                        os.close(fd)
+                except OSError:
+                    continue
+                self.warmed[path] = now
+                remaining -= size
+                files += 1
+                bytes_advised += size
+            with self.condition:
+                self.prefetched[desktop_id] = now
+            if remaining <= 0:
+                break
+
+        with self.condition:
+            self.stats['rounds'] += 1
+            self.stats['files'] += files
+            self.stats['bytes'] += bytes_advised
+            self.stats['advise_ms'] += (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def executable_for(desktop_path, app_info):
+        """Absolute path of the program an entry's Exec line starts"""
+        try:
+            if app_info is None:
+                app_info = Gio.DesktopAppInfo.new_from_filename(desktop_path)
+            argv = shlex.split(app_info.get_commandline() or '')
+        except Exception:
+            return None
+        # Skip env and its VAR=value assignments
+        while argv and (os.path.basename(argv[0]) == 'env' or '=' in argv[0]):
+            argv.pop(0)
+        if not argv:
+            return None
+        executable = shutil.which(argv[0])
+        return os.path.realpath(executable) if executable else None
+
+    def files_for(self, executable):
+        """The executable plus its interpreter or shared libraries, with sizes"""
+        files = []
+        seen = set()
+        queue = [(executable, [])]
+        while queue and len(files) < 256:
+            path, search_dirs = queue.pop(0)
+            try:
+                path = os.path.realpath(path)
+                if path in seen:
+                    continue
+                seen.add(path)
+                files.append((path, os.stat(path).st_size))
+                with open(path, 'rb') as f:
+                    head = f.read(256)
+            except OSError:
+                continue
+
+            if head.startswith(b'#!'):
+                words = head[2:].split(b'\n', 1)[0].decode(errors='replace').split()
+                if words and os.path.basename(words[0]) == 'env' and len(words) > 1:
+                    interpreter = shutil.which(words[1])
+                else:
+                    interpreter = words[0] if words else None
+                if interpreter:
+                    queue.append((interpreter, []))
+            elif head.startswith(b'\x7fELF'):
+                try:
+                    needed, runpaths = elf_dependencies(path)
+                except (OSError, struct.error):
+                    continue
+                dirs = runpaths + search_dirs + LIBRARY_DIRS
+                for name in needed:
+                    for directory in dirs:
+                        candidate = os.path.join(directory, name)
+                        if os.path.exists(candidate):
+                            # Libraries inherit the runpath of what loaded them
+                            queue.append((candidate, runpaths + search_dirs))
+                            break
+        return files
+
+
+class WakeupMonitor:
+    """Accounting for the main-loop sources the launcher creates.
+
+    idle_add() and timeout_add() wrap GLib's and count, per callback, how
+    many sources were added and dispatched, separately for while the
+    launcher is hidden; note() counts other callbacks such as file monitor
+    signals. The main thread's voluntary context switches while hidden
+    are sampled from /proc as well, which also catches wakeups from
+    sources that do not go through this class (GTK's own, for example).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.hidden = False
+        self.hidden_since = None
+        self.hidden_seconds = 0.0
+        self.switches_at_hide = None
+        self.hidden_switches = 0
+
+    def idle_add(self, func, *args, priority=GLib.PRIORITY_DEFAULT_IDLE):
+        self.note(func, 'added')
+        return GLib.idle_add(self._dispatch, func, args, priority=priority)
+
+    def timeout_add(self, interval, func, *args):
+        self.note(func, 'added')
+        return GLib.timeout_add(interval, self._dispatch, func, args)
+
+    def _dispatch(self, func, args):
+        self.note(func, 'dispatched')
+        return func(*args)
+
+    def note(self, func, event='dispatched'):
+        name = func if isinstance(func, str) else getattr(func, '__qualname__', repr(func))
+        with self.lock:
+            entry = self.counts[name]
+            entry[event] += 1
+            if self.hidden:
+                entry[event + '_hidden'] += 1
+
+    def set_hidden(self, hidden):
+        now = time.monotonic()
+        with self.lock:
+            if hidden == self.hidden:
+                return
+            self.hidden = hidden
+            switches = self._main_thread_switches()
+            if hidden:
+                self.hidden_since = now
+                self.switches_at_hide = switches
+            else:
+                self.hidden_seconds += now - self.hidden_since
+                self.hidden_since = None
+                if switches is not None and self.switches_at_hide is not None:
+                    self.hidden_switches += switches - self.switches_at_hide
+
+    @staticmethod
+    def _main_thread_switches():
+        try:
+            with open(f"/proc/self/task/{threading.main_thread().native_id}/status") as f:
+                for line in f:
+                    if line.startswith('voluntary_ctxt_switches:'):
+                        return int(line.split()[1])
+        except (OSError, ValueError, AttributeError):
+            pass
+        return None
+
+    def report(self):
+        with self.lock:
+            hidden_seconds = self.hidden_seconds
+            hidden_switches = self.hidden_switches
+            if self.hidden:
+                hidden_seconds += time.monotonic() - self.hidden_since
+                switches = self._main_thread_switches()
+                if switches is not None and self.switches_at_hide is not None:
+                    hidden_switches += switches - self.switches_at_hide
+            sources = {name: dict(entry) for name, entry in sorted(self.counts.items())}
+        return {
+            'hidden': self.hidden,
+            'hidden_seconds': round(hidden_seconds, 1),
+            'dispatched_while_hidden': sum(e.get('dispatched_hidden', 0) for e in sources.values()),
+            'added_while_hidden': sum(e.get('added_hidden', 0) for e in sources.values()),
+            'main_thread_wakeups_while_hidden': hidden_switches,
+            'sources': sources,
+        }
+
+
+def default_search_providers():
+    """The search providers of a normal run, in the order their rows appear"""
+    return [
+        OpenWithProvider(),
+        HistoryProvider(),
+        CommandProvider(),
+        RecentFilesProvider(),
+        BookmarkProvider(),
+        FileIndexProvider(),
+        UnicodeProvider(),
+    ]
 
 
 class AppLauncher(Gtk.Window):
     
-    def __init__(self):
+    def __init__(self, snapshot_file=CATALOG_SNAPSHOT_FILE, search_providers=None,
+                 icon_atlas_file=ICON_ATLAS_FILE, launch_history_file=LAUNCH_HISTORY_FILE):
         super().__init__(title="Applications")
         self.set_role("pylauncher")
         self.set_default_size(250, 400)
@@ -29,14 +2239,68 @@ class AppLauncher(Gtk.Window):
         self.set_skip_taskbar_hint(True)
         self.set_skip_pager_hint(True)
         
+        # Every idle/timeout source goes through this, see dump_wakeups()
+        self.wakeups = WakeupMonitor()
+        # Work postponed until the launcher is next shown
+        self.deferred = []
+        self.settings = self.load_settings()
         self.favorites = self.load_favorites()
+        self.profiles = self.load_profiles()
+        self.last_profile_report = None
+        self.modal_open = False
         self.all_apps = []  # Load asynchronously
         self.categories = {}
+        self.apps_by_id = {}
         self.apps_loaded = False
+        # Bumped whenever the catalog or favorites change; keys the search memo
+        self.catalog_generation = 0
+        self.search_cache = QueryCache()
+        # Typo-tolerant fallback index: (apps, BKTree, words) of the catalog
+        # it was built from, built on a thread whenever the catalog changes
+        self.fuzzy = None
+        self.fuzzy_thread = None
+        self.fuzzy_building = None
+
+        # Asynchronous search providers, queried after the app results
+        if search_providers is None:
+            search_providers = default_search_providers()
+        self.search_providers = search_providers
+        self.provider_pool = None
+        self.provider_cancellables = []
+        self.search_serial = 0
+        # Idle source appending the slower search tiers, and its state
+        self.search_stream = None
+        self.search_stream_state = None
+        self.app_scanner = ApplicationScanner()
+        self.icon_atlas = IconAtlas(icon_atlas_file)
+        self.icon_atlas.open(self._icon_theme_name())
+
+        # Page-cache warming for likely launches (opt-in)
+        self.prefetcher = None
+        self.launch_history = {}
+        self.launch_history_file = Path(launch_history_file)
+        if self.settings['prefetch_apps']:
+            self.prefetcher = PagePrefetcher(self.settings['prefetch_budget_mb'] * 1024 * 1024)
+            self.launch_history = self.load_launch_history()
+
+        # Running windows, when the compositor exposes them
+        self.window_provider = None
+        niri_socket = os.environ.get('NIRI_SOCKET')
+        if niri_socket and self.settings['focus_running_windows']:
+            self.window_provider = NiriWindowProvider(niri_socket)
+            self.window_provider.start()
+
+        # Search session being recorded, when record_queries is on
+        self.query_session = None
         self._visible = False
 
         self.dragging = False
         self.drag_row = None
+        self.drag_target = None
+        self.drag_placeholder = None
+        self.drag_pending_y = None
+        self.drag_tick_id = None
+        self.drag_tick_listbox = None
         self.last_hovered_row = None
         self.focus_out_timeout = None
 
@@ -45,14 +2309,28 @@ class AppLauncher(Gtk.Window):
         
         # Animation state
         self.is_animating = False
+
+        # Speculative population of the offscreen stack page
+        self.page_keys = {}
+        self.prefetch_source = None
         
         self.apply_css()
         self.build_ui()
 
-        # Load apps and populate before showing
-        self.all_apps = self.load_applications()
-        self.categories = self.organize_by_category()
-        self.apps_loaded = True
+        # Paint from the last known catalog and revalidate it in the
+        # background; only the very first run has to load synchronously
+        self.catalog_loading = False
+        # A loaded catalog waiting for a drag or a slide to end
+        self.pending_catalog = None
+        self.snapshot_file = snapshot_file
+        snapshot = read_catalog_snapshot(self.snapshot_file)
+        if snapshot:
+            self.set_catalog(snapshot)
+        else:
+            apps = self.load_applications()
+            self.set_catalog(apps)
+            self.apps_loaded = True
+            write_catalog_snapshot(catalog_snapshot(apps), self.snapshot_file)
         self.show_favorites_view()
 
         # Connect events
@@ -69,6 +2347,20 @@ class AppLauncher(Gtk.Window):
         # Signal waybar that launcher is active
         self._signal_waybar()
 
+        if not self.apps_loaded:
+            self.reload_catalog()
+
+        # Refresh stale atlas icons once the first frame is out
+        self.wakeups.idle_add(self._maintain_icon_atlas, priority=GLib.PRIORITY_LOW)
+        # Build indexes that are otherwise only refreshed while hidden
+        for provider in self.search_providers:
+            if provider.refresh_while_hidden:
+                provider.maybe_refresh()
+
+        # Installed/removed apps reload the catalog, on the next show if hidden
+        self.catalog_reload_source = None
+        self.app_dir_monitors = self.watch_application_dirs()
+
     def _on_delete_event(self, widget, event):
         self.hide_launcher()
         return True
@@ -80,7 +2372,11 @@ class AppLauncher(Gtk.Window):
             self.show_launcher()
 
     def show_launcher(self):
-        self.favorites = self.load_favorites()
+        self.profiles = self.load_profiles()
+        favorites = self.load_favorites()
+        if favorites != self.favorites:
+            self.favorites = favorites
+            self.catalog_generation += 1
         # Reset to favorites view
         for child in self.listbox.get_children():
             self.listbox.remove(child)
@@ -97,10 +2393,16 @@ class AppLauncher(Gtk.Window):
         self.show_all()
         self.present()
         self._visible = True
+        self.wakeups.set_hidden(False)
+        self.run_deferred()
+        for provider in self.search_providers:
+            if not provider.refresh_while_hidden:
+                provider.maybe_refresh()
+        self.prefetch_likely_apps()
         # Defer first-row selection so it runs after GTK processes present() focus events
-        GLib.idle_add(self._select_first_row)
+        self.wakeups.idle_add(self._select_first_row)
         self._signal_waybar()
-        GLib.timeout_add(150, self._unblock_row_activation)
+        self.wakeups.timeout_add(150, self._unblock_row_activation)
 
     def _unblock_row_activation(self):
         self.listbox_1.handler_unblock_by_func(self.on_row_activated)
@@ -111,9 +2413,51 @@ class AppLauncher(Gtk.Window):
         if self.focus_out_timeout:
             GLib.source_remove(self.focus_out_timeout)
             self.focus_out_timeout = None
-        self.hide()
+        # Cleared first so provider workers see it once their query is cancelled
         self._visible = False
+        self.cancel_prefetch()
+        self.cancel_search_stream()
+        self.cancel_provider_queries()
+        self.cancel_drag()
+        self.hide()
+        self.save_query_session()
         self._signal_waybar()
+        if self.catalog_reload_source:
+            GLib.source_remove(self.catalog_reload_source)
+            self.catalog_reload_source = None
+            self.run_when_visible(self._schedule_catalog_reload)
+        if self.pending_catalog is not None:
+            self.run_when_visible(self._install_pending_catalog)
+        if self.icon_atlas.dirty:
+            self.wakeups.idle_add(self.icon_atlas.save, priority=GLib.PRIORITY_LOW)
+        for provider in self.search_providers:
+            if provider.refresh_while_hidden:
+                provider.maybe_refresh()
+        # Nothing below may wake the main loop until the next show
+        self.wakeups.set_hidden(True)
+
+    def run_when_visible(self, func):
+        """Call func now if the launcher is shown, else once on the next show"""
+        if self._visible:
+            func()
+        elif func not in self.deferred:
+            self.deferred.append(func)
+
+    def run_deferred(self):
+        deferred, self.deferred = self.deferred, []
+        for func in deferred:
+            func()
+
+    def dump_wakeups(self):
+        """Print the wakeup report and write it to WAKEUP_REPORT_FILE (SIGUSR2)"""
+        text = json.dumps(self.wakeups.report(), indent=2)
+        print(text, flush=True)
+        try:
+            WAKEUP_REPORT_FILE.parent.mkdir(parents=True, exist_ok=True)
+            WAKEUP_REPORT_FILE.write_text(text + "\n")
+        except OSError as e:
+            print(f"Failed to write wakeup report: {e}")
+        return False
 
     def _signal_waybar(self):
         with open(LOCK_FILE, 'w') as f:
@@ -147,6 +2491,13 @@ class AppLauncher(Gtk.Window):
 		    list row:selected:hover {
 		        background-color: alpha(@theme_selected_bg_color, 0.7);
 		    }
+		    /* Favorites drag reordering */
+		    list row.drag-source {
+		        opacity: 0.4;
+		    }
+		    list row.drag-placeholder {
+		        background-color: alpha(@theme_selected_bg_color, 0.25);
+		    }
         """)
         screen = Gdk.Screen.get_default()
         style_context = Gtk.StyleContext()
@@ -172,6 +2523,7 @@ class AppLauncher(Gtk.Window):
         self.listbox_1 = Gtk.ListBox()
         self.listbox_1.set_selection_mode(Gtk.SelectionMode.SINGLE)
         self.listbox_1.connect("row-activated", self.on_row_activated)
+        self.listbox_1.connect("row-selected", self.on_row_selected)
         self.listbox_1.add_events(Gdk.EventMask.POINTER_MOTION_MASK | Gdk.EventMask.LEAVE_NOTIFY_MASK)
         self.listbox_1.connect("motion-notify-event", self.on_listbox_motion)
         self.listbox_1.connect("leave-notify-event", self.on_listbox_leave)
@@ -182,6 +2534,7 @@ class AppLauncher(Gtk.Window):
         self.listbox_2 = Gtk.ListBox()
         self.listbox_2.set_selection_mode(Gtk.SelectionMode.SINGLE)
         self.listbox_2.connect("row-activated", self.on_row_activated)
+        self.listbox_2.connect("row-selected", self.on_row_selected)
         self.listbox_2.add_events(Gdk.EventMask.POINTER_MOTION_MASK | Gdk.EventMask.LEAVE_NOTIFY_MASK)
         self.listbox_2.connect("motion-notify-event", self.on_listbox_motion)
         self.listbox_2.connect("leave-notify-event", self.on_listbox_leave)
@@ -278,15 +2631,19 @@ class AppLauncher(Gtk.Window):
         self.nav_button_box.show_all()
 
     
-    def animate_transition(self, direction, populate_func):
+    def animate_transition(self, direction, populate_func, view_key=None):
         """Animate transition between views
         direction: 'forward' or 'back'
         populate_func: function to populate the new view
+        view_key: identifies the view; if the offscreen page was already
+                  speculatively built for it, it is shown as-is
+        Returns False if a transition is already running.
         """
         if self.is_animating:
-            return
+            return False
         
         self.is_animating = True
+        self.cancel_prefetch()
         
         # Switch to the other view
         if self.current_view == "view1":
@@ -298,12 +2655,15 @@ class AppLauncher(Gtk.Window):
             next_listbox = self.listbox_1
             next_scrolled = self.content_scrolled_1
         
-        # Populate the next view
-        for child in next_listbox.get_children():
-            next_listbox.remove(child)
-        
-        populate_func(next_listbox)
-        next_listbox.show_all()
+        # Populate the next view unless it already holds this view
+        if view_key is None or not self._page_holds(next_listbox, view_key):
+            for child in next_listbox.get_children():
+                next_listbox.remove(child)
+            
+            populate_func(next_listbox)
+            next_listbox.show_all()
+            next_scrolled.get_vadjustment().set_value(0)
+            self._set_page_key(next_listbox, view_key)
         
         # Set transition direction
         if direction == 'forward':
@@ -320,12 +2680,15 @@ class AppLauncher(Gtk.Window):
         self.content_scrolled = next_scrolled
         
         # Select first row after animation
-        GLib.timeout_add(260, self._post_animation_setup)
+        self.wakeups.timeout_add(260, self._post_animation_setup)
+        return True
     
     def _post_animation_setup(self):
         """Called after animation completes"""
         self.is_animating = False
-        GLib.idle_add(self._select_first_row)
+        self.wakeups.idle_add(self._select_first_row)
+        self.predict_next_view()
+        self._install_pending_catalog()
         return False
 
     def _select_first_row(self):
@@ -337,116 +2700,336 @@ class AppLauncher(Gtk.Window):
             if not self.search_entry.has_focus():
                 first_row.grab_focus()
         return False
+
+    def _set_page_key(self, listbox, view_key):
+        """Record which view a stack page currently holds"""
+        self.page_keys[listbox] = (view_key, self.catalog_generation) if view_key else None
+
+    def _page_holds(self, listbox, view_key):
+        return self.page_keys.get(listbox) == (view_key, self.catalog_generation)
+
+    def predict_next_view(self):
+        """Guess where the user goes next from the current view"""
+        if not self.view_stack or self.search_entry.get_text():
+            return
+        if self.view_stack[-1][0] == 'favorites':
+            self.schedule_prefetch(('categories',))
+        # In the categories view the guess follows the selected row
+
+    def schedule_prefetch(self, view_key, delay=0):
+        """Build view_key into the offscreen stack page once the UI is idle"""
+        self.cancel_prefetch()
+        if delay:
+            self.prefetch_source = self.wakeups.timeout_add(delay, self._run_prefetch, view_key)
+        else:
+            self.prefetch_source = self.wakeups.idle_add(self._run_prefetch, view_key,
+                                                         priority=GLib.PRIORITY_LOW)
+
+    def cancel_prefetch(self):
+        if self.prefetch_source:
+            GLib.source_remove(self.prefetch_source)
+            self.prefetch_source = None
+
+    def _run_prefetch(self, view_key):
+        self.prefetch_source = None
+        if self.is_animating or not self._visible or self.search_entry.get_text():
+            return False
+
+        idle_listbox = self.listbox_2 if self.listbox is self.listbox_1 else self.listbox_1
+        if self._page_holds(idle_listbox, view_key):
+            return False
+
+        if view_key[0] == 'categories':
+            populate = self._populate_categories
+        elif view_key[0] == 'category':
+            apps = self._category_apps(view_key[1])
+            # Building a huge list would stall the main loop; leave it to the click
+            if apps is None or len(apps) > PREFETCH_MAX_ROWS:
+                return False
+            populate = lambda listbox: self._populate_category_apps(listbox, apps)
+        else:
+            return False
+
+        # A wrong earlier guess is simply overwritten
+        for child in idle_listbox.get_children():
+            idle_listbox.remove(child)
+        populate(idle_listbox)
+        idle_listbox.show_all()
+        idle_scrolled = self.content_scrolled_2 if idle_listbox is self.listbox_2 else self.content_scrolled_1
+        idle_scrolled.get_vadjustment().set_value(0)
+        self._set_page_key(idle_listbox, view_key)
+        return False
+
+    def on_row_selected(self, listbox, row):
+        """Prefetch a category's app list while its row is hovered or selected"""
+        if listbox is not self.listbox or row is None or self.is_animating:
+            return
+        if getattr(row, 'is_category', False) and self.view_stack and self.view_stack[-1][0] == 'categories':
+            self.schedule_prefetch(('category', row.category_name), delay=120)
+
+    def _category_apps(self, category_name):
+        if category_name == "All Applications":
+            return self.all_apps
+        return self.categories.get(category_name)
+
+    def _populate_favorites(self, listbox):
+        for desktop_id in self.favorites:
+            app = self.apps_by_id.get(desktop_id)
+            if app:
+                row = self.create_app_row(app, is_favorite=True, draggable=True)
+                listbox.add(row)
+
+    def _populate_categories(self, listbox):
+        # Add "All Applications" entry first
+        all_apps_row = self.create_category_row(
+            "All Applications",
+            "applications-other",
+            self.all_apps
+        )
+        listbox.add(all_apps_row)
+        
+        # Add category rows
+        for category in sorted(self.categories.keys()):
+            apps = self.categories[category]
+            if apps:
+                row = self.create_category_row(
+                    category, 
+                    CATEGORY_ICONS.get(category, 'folder'),
+                    apps
+                )
+                listbox.add(row)
+
+    def _populate_category_apps(self, listbox, apps):
+        for app in sorted(apps, key=lambda x: x['name'].lower()):
+            is_fav = app['desktop_id'] in self.favorites
+            row = self.create_app_row(app, is_favorite=is_fav, draggable=False)
+            listbox.add(row)
     
     def show_favorites_view(self, animate=False, direction='back'):
         """Show the favorites view with 'All Applications' button"""
         self.view_stack = [('favorites',)]
         
-        def populate(listbox):
-            # Add favorites
-            for desktop_id in self.favorites:
-                app = next((a for a in self.all_apps if a['desktop_id'] == desktop_id), None)
-                if app:
-                    row = self.create_app_row(app, is_favorite=True, draggable=True)
-                    listbox.add(row)
-            
-            # Update navigation button
-            self.rebuild_nav_button("forward", "All Applications", "folder", self.show_categories_view)
-        
         if animate:
-            self.animate_transition(direction, populate)
+            if not self.animate_transition(direction, self._populate_favorites, ('favorites',)):
+                return
         else:
-            populate(self.listbox)
+            for child in self.listbox.get_children():
+                self.listbox.remove(child)
+            self._populate_favorites(self.listbox)
+            self._set_page_key(self.listbox, ('favorites',))
             self.listbox.show_all()
-            GLib.idle_add(self._select_first_row)
+            self.wakeups.idle_add(self._select_first_row)
+            self.predict_next_view()
+        
+        # Update navigation button
+        self.rebuild_nav_button("forward", "All Applications", "folder", self.show_categories_view)
 
     
     def show_categories_view(self, direction='forward'):
         """Show all application categories"""
         self.view_stack.append(('categories',))
         
-        # Get category icons
-        category_icons = {
-            'Multimedia': 'applications-multimedia',
-            'Development': 'applications-development',
-            'Education': 'applications-science',
-            'Games': 'applications-games',
-            'Graphics': 'applications-graphics',
-            'Internet': 'applications-internet',
-            'Office': 'applications-office',
-            'Science': 'applications-science',
-            'Settings': 'preferences-system',
-            'System Tools': 'applications-system',
-            'Accessories': 'applications-accessories',
-            'Other': 'applications-other',
-        }
-        
-        def populate(listbox):
-            # Add "All Applications" entry first
-            all_apps_row = self.create_category_row(
-                "All Applications",
-                "applications-other",
-                self.all_apps
-            )
-            listbox.add(all_apps_row)
-            
-            # Add category rows
-            for category in sorted(self.categories.keys()):
-                apps = self.categories[category]
-                if apps:
-                    row = self.create_category_row(
-                        category, 
-                        category_icons.get(category, 'folder'),
-                        apps
-                    )
-                    listbox.add(row)
-            
+        if self.animate_transition(direction, self._populate_categories, ('categories',)):
             # Update navigation button to Back
             self.rebuild_nav_button("back", "Back", "go-previous", self.go_back)
-        
-        self.animate_transition(direction, populate)
 
     
     def show_category_apps(self, category_name, apps, direction='forward', animate=True):
         """Show all apps in a category"""
         self.view_stack.append(('category', category_name, apps))
-        
-        def populate(listbox):
-            # Add app rows
-            for app in sorted(apps, key=lambda x: x['name'].lower()):
-                is_fav = app['desktop_id'] in self.favorites
-                row = self.create_app_row(app, is_favorite=is_fav, draggable=False)
-                listbox.add(row)
-            
-            # Update navigation button to Back
-            self.rebuild_nav_button("back", f"Back", "go-previous", self.go_back)
+        view_key = ('category', category_name)
         
         if animate:
-            self.animate_transition(direction, populate)
+            populate = lambda listbox: self._populate_category_apps(listbox, apps)
+            if not self.animate_transition(direction, populate, view_key):
+                return
         else:
             # Non-animated version for refreshes
             for child in self.listbox.get_children():
                 self.listbox.remove(child)
-            populate(self.listbox)
+            self._populate_category_apps(self.listbox, apps)
+            self._set_page_key(self.listbox, view_key)
             self.listbox.show_all()
-            GLib.idle_add(self._select_first_row)
+            self.wakeups.idle_add(self._select_first_row)
+        
+        # Update navigation button to Back
+        self.rebuild_nav_button("back", "Back", "go-previous", self.go_back)
 
     
     def show_search_results(self, query):
-        """Show search results"""
+        """Show search results.
+
+        Exact and title matches are rendered, and the first row selected,
+        before this returns; description/keyword matches are appended from
+        idle slices so Enter on a title match never waits for them.
+        """
         # Clear listbox
+        self.cancel_prefetch()
+        self.cancel_search_stream()
         for child in self.listbox.get_children():
             self.listbox.remove(child)
+        self._set_page_key(self.listbox, None)
+
+        key = query.lower()
+        ids = self.search_cache.get(key, self.catalog_generation)
+        if ids is not None:
+            apps = [self.apps_by_id[desktop_id] for desktop_id in ids]
+            # Title matches lead the memoized list; keep them a separate tier
+            titles = 0
+            while titles < len(apps) and key in apps[titles]['name'].lower():
+                titles += 1
+            tiers = iter([apps[:titles], apps[titles:]])
+        else:
+            tiers = self.iter_search_tiers(key)
+        stream = {
+            'tiers': tiers, 'key': key, 'generation': self.catalog_generation,
+            'apps': [], 'cached': ids is not None,
+        }
+        self.add_search_app_rows(stream, next(tiers, []))
+
+        # Profiles go below exact and title matches so Enter on an app name launches the app
+        for name in self.search_profiles(query):
+            self.listbox.add(self.create_profile_row(name))
         
-        apps_to_show = self.search_apps(query)[:20]
-        
-        for app in apps_to_show:
+        self.listbox.show_all()
+        self._select_first_row()
+        self.query_providers(query)
+        self.search_stream_state = stream
+        self.search_stream = self.wakeups.idle_add(self._continue_search_stream, stream,
+                                                   priority=GLib.PRIORITY_LOW)
+
+    def _continue_search_stream(self, stream, drain=False):
+        deadline = time.monotonic() + SEARCH_SLICE_SECONDS
+        for batch in stream['tiers']:
+            self.add_search_app_rows(stream, batch)
+            if not drain and time.monotonic() >= deadline:
+                return True
+
+        self.search_stream = None
+        self.search_stream_state = None
+        apps = stream['apps']
+        if not stream['cached']:
+            self.search_cache.put(stream['key'], stream['generation'],
+                                  [app['desktop_id'] for app in apps])
+        # The query has narrowed to one app: it is about to be launched
+        if self.prefetcher is not None and len(apps) == 1:
+            self.prefetcher.request(apps)
+        return False
+
+    def cancel_search_stream(self):
+        if self.search_stream is not None:
+            GLib.source_remove(self.search_stream)
+            self.search_stream = None
+            self.search_stream_state = None
+
+    def finish_search_stream(self):
+        """Append the tiers still pending now, so activation sees every match"""
+        if self.search_stream is not None:
+            GLib.source_remove(self.search_stream)
+            self._continue_search_stream(self.search_stream_state, drain=True)
+
+    def add_search_app_rows(self, stream, batch):
+        """Append a batch of matches below the app rows shown so far, above provider rows"""
+        shown = len(stream['apps'])
+        stream['apps'].extend(batch)
+        batch = batch[:max(0, SEARCH_MAX_ROWS - shown)]
+        if not batch:
+            return
+
+        position = -1
+        for i, child in enumerate(self.listbox.get_children()):
+            if hasattr(child, 'provider_index'):
+                position = i
+                break
+        for app in batch:
             is_fav = app['desktop_id'] in self.favorites
             row = self.create_app_row(app, is_fav, draggable=False)
-            self.listbox.add(row)
-        
-        self.listbox.show_all()
-        GLib.idle_add(self._select_first_row)
+            row.show_all()
+            self.listbox.insert(row, position)
+            if position >= 0:
+                position += 1
+
+        if self.listbox.get_selected_row() is None:
+            self._select_first_row()
+
+    def query_providers(self, query):
+        """Start every provider on query; results stream in below the apps"""
+        self.cancel_provider_queries()
+        serial = self.search_serial
+        for index, provider in enumerate(self.search_providers):
+            if len(query.strip()) >= provider.min_query_length:
+                self._start_provider(index, provider, query, serial)
+
+    def cancel_provider_queries(self):
+        """Invalidate in-flight provider queries"""
+        self.search_serial += 1
+        for cancellable, call in self.provider_cancellables:
+            cancellable.cancel()
+            if call['deadline'] is not None:
+                GLib.source_remove(call['deadline'])
+                call['deadline'] = None
+        self.provider_cancellables = []
+
+    def _start_provider(self, index, provider, query, serial):
+        if provider.busy:
+            # Never queue up behind a slow provider; only the latest query runs next
+            provider.pending = (query, serial)
+            return
+        if self.provider_pool is None:
+            self.provider_pool = ThreadPoolExecutor(max_workers=max(4, len(self.search_providers)))
+        provider.busy = True
+        cancellable = Gio.Cancellable()
+        call = {'deadline': None}
+        self.provider_cancellables.append((cancellable, call))
+        call['deadline'] = self.wakeups.timeout_add(provider.budget_ms, self._on_provider_deadline, call, cancellable)
+        self.provider_pool.submit(self._run_provider, index, provider, query, serial, cancellable, call)
+
+    def _on_provider_deadline(self, call, cancellable):
+        call['deadline'] = None
+        cancellable.cancel()
+        return False
+
+    def _run_provider(self, index, provider, query, serial, cancellable, call):
+        try:
+            results = provider.query(query, cancellable)
+        except Exception as e:
+            print(f"Search provider {provider.name} failed: {e}")
+            results = []
+        if cancellable.is_cancelled() and not self._visible:
+            # Cancelled by hide_launcher: drop the results without waking the main loop
+            provider.pending = None
+            provider.busy = False
+            return
+        self.wakeups.idle_add(self._on_provider_results, index, provider, serial, cancellable, call, results)
+
+    def _on_provider_results(self, index, provider, serial, cancellable, call, results):
+        provider.busy = False
+        if call['deadline'] is not None:
+            GLib.source_remove(call['deadline'])
+            call['deadline'] = None
+
+        if results and serial == self.search_serial and not cancellable.is_cancelled():
+            self.add_provider_rows(index, results[:provider.max_results])
+
+        pending, provider.pending = provider.pending, None
+        if pending and pending[1] == self.search_serial:
+            self._start_provider(index, provider, *pending)
+        return False
+
+    def add_provider_rows(self, index, results):
+        """Insert result rows, keeping providers in registration order"""
+        position = -1
+        for i, child in enumerate(self.listbox.get_children()):
+            if getattr(child, 'provider_index', -1) > index:
+                position = i
+                break
+        for result in results:
+            row = self.create_result_row(result)
+            row.provider_index = index
+            row.show_all()
+            self.listbox.insert(row, position)
+            if position >= 0:
+                position += 1
 
 
     def go_back(self):
@@ -481,23 +3064,114 @@ class AppLauncher(Gtk.Window):
         hbox.set_margin_bottom(5)
         hbox.set_size_request(-1, 28)
         
-        icon = Gtk.Image.new_from_icon_name(icon_name, Gtk.IconSize.LARGE_TOOLBAR)
+        icon = Gtk.Image.new_from_icon_name(icon_name, Gtk.IconSize.LARGE_TOOLBAR)
+        hbox.pack_start(icon, False, False, 0)
+        
+        label = Gtk.Label(label=category_name)
+        label.set_xalign(0.0)
+        hbox.pack_start(label, True, True, 0)
+        
+        arrow = Gtk.Image.new_from_icon_name("pan-end-symbolic", Gtk.IconSize.BUTTON)
+        hbox.pack_start(arrow, False, False, 0)
+        
+        event_box.add(hbox)
+        row.add(event_box)
+
+        event_box.add_events(Gdk.EventMask.ENTER_NOTIFY_MASK | Gdk.EventMask.LEAVE_NOTIFY_MASK)
+        event_box.connect("enter-notify-event", self.on_row_enter, row)
+        event_box.connect("leave-notify-event", self.on_row_leave, row)        
+
+        return row
+
+    
+    def create_profile_row(self, profile_name):
+        """Create a row that launches every app of a profile"""
+        row = Gtk.ListBoxRow()
+        row.profile_name = profile_name
+        row.is_category = False
+        row.is_hovered = False
+        
+        event_box = Gtk.EventBox()
+        
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        hbox.set_margin_start(5)
+        hbox.set_margin_end(5)
+        hbox.set_margin_top(5)
+        hbox.set_margin_bottom(5)
+        hbox.set_size_request(-1, 28)
+        
+        icon = Gtk.Image.new_from_icon_name("view-app-grid-symbolic", Gtk.IconSize.LARGE_TOOLBAR)
+        hbox.pack_start(icon, False, False, 0)
+        
+        members = [self.apps_by_id[d]['name'] for d in self.profiles.get(profile_name, [])
+                   if d in self.apps_by_id]
+        label = Gtk.Label(label=profile_name)
+        label.set_xalign(0.0)
+        label.set_ellipsize(3)
+        label.set_tooltip_text("Launch together:\n" + "\n".join(members))
+        hbox.pack_start(label, True, True, 0)
+        
+        count = Gtk.Label(label=str(len(members)))
+        count.set_sensitive(False)
+        hbox.pack_start(count, False, False, 0)
+        
+        event_box.add(hbox)
+        row.add(event_box)
+        
+        event_box.add_events(Gdk.EventMask.ENTER_NOTIFY_MASK | Gdk.EventMask.LEAVE_NOTIFY_MASK)
+        event_box.connect("enter-notify-event", self.on_row_enter, row)
+        event_box.connect("leave-notify-event", self.on_row_leave, row)
+        
+        return row
+
+    
+    def create_result_row(self, result):
+        """Create a row for a search provider result"""
+        row = Gtk.ListBoxRow()
+        row.result = result
+        row.is_category = False
+        row.is_hovered = False
+        
+        event_box = Gtk.EventBox()
+        
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        hbox.set_margin_start(5)
+        hbox.set_margin_end(5)
+        hbox.set_margin_top(3)
+        hbox.set_margin_bottom(3)
+        
+        if result.get('app'):
+            icon = self.create_icon(result['app'])
+        elif result.get('glyph'):
+            icon = Gtk.Label()
+            icon.set_markup(f"<span size='x-large'>{GLib.markup_escape_text(result['glyph'])}</span>")
+            icon.set_size_request(32, 32)
+        else:
+            icon = Gtk.Image.new_from_icon_name(result.get('icon_name') or "system-search", Gtk.IconSize.DND)
         hbox.pack_start(icon, False, False, 0)
         
-        label = Gtk.Label(label=category_name)
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        label = Gtk.Label(label=result['title'])
         label.set_xalign(0.0)
-        hbox.pack_start(label, True, True, 0)
+        label.set_ellipsize(3)
+        label.set_tooltip_text(result['title'])
+        vbox.pack_start(label, False, False, 0)
         
-        arrow = Gtk.Image.new_from_icon_name("pan-end-symbolic", Gtk.IconSize.BUTTON)
-        hbox.pack_start(arrow, False, False, 0)
+        if result.get('subtitle'):
+            subtitle = Gtk.Label(label=result['subtitle'])
+            subtitle.set_xalign(0.0)
+            subtitle.set_ellipsize(3)
+            subtitle.get_style_context().add_class("dim-label")
+            vbox.pack_start(subtitle, False, False, 0)
         
+        hbox.pack_start(vbox, True, True, 0)
         event_box.add(hbox)
         row.add(event_box)
-
+        
         event_box.add_events(Gdk.EventMask.ENTER_NOTIFY_MASK | Gdk.EventMask.LEAVE_NOTIFY_MASK)
         event_box.connect("enter-notify-event", self.on_row_enter, row)
-        event_box.connect("leave-notify-event", self.on_row_leave, row)        
-
+        event_box.connect("leave-notify-event", self.on_row_leave, row)
+        
         return row
 
     
@@ -506,6 +3180,7 @@ class AppLauncher(Gtk.Window):
         row.app_data = app
         row.is_hovered = False
         row.is_category = False
+        row.is_draggable = draggable
         
         event_box = Gtk.EventBox()
         
@@ -578,22 +3253,14 @@ class AppLauncher(Gtk.Window):
         load_size = target_size * scale_factor
         
         try:
-            icon_theme = Gtk.IconTheme.get_default()
+            key = f"{app['icon'].to_string()}@{load_size}"
+            pixbuf = self.icon_atlas.lookup(key)
+            if pixbuf is None:
+                pixbuf = self.rasterize_icon(app['icon'], load_size, key)
             
-            if isinstance(app['icon'], Gio.ThemedIcon):
-                icon_names = app['icon'].get_names()
-                pixbuf = icon_theme.load_icon(icon_names[0], load_size, Gtk.IconLookupFlags.FORCE_SIZE)
-                
-                surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale_factor, None)
-                icon_widget.set_from_surface(surface)
-                
-            elif isinstance(app['icon'], Gio.FileIcon):
-                icon_path = app['icon'].get_file().get_path()
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(icon_path, load_size, load_size)
-                
+            if pixbuf is not None:
                 surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale_factor, None)
                 icon_widget.set_from_surface(surface)
-                
             else:
                 icon_widget.set_from_icon_name("application-x-executable", Gtk.IconSize.DND)
                 
@@ -602,12 +3269,55 @@ class AppLauncher(Gtk.Window):
         
         return icon_widget
 
-    
+    def rasterize_icon(self, gicon, load_size, key):
+        """Decode an icon at load_size and hand it to the atlas"""
+        if isinstance(gicon, Gio.ThemedIcon):
+            icon_theme = Gtk.IconTheme.get_default()
+            icon_names = gicon.get_names()
+            info = icon_theme.lookup_icon(icon_names[0], load_size, Gtk.IconLookupFlags.FORCE_SIZE)
+            if info is None:
+                return None
+            pixbuf = info.load_icon()
+            source = info.get_filename()
+            theme = self.icon_atlas.theme
+            
+        elif isinstance(gicon, Gio.FileIcon):
+            source = gicon.get_file().get_path()
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(source, load_size, load_size)
+            theme = ''
+            
+        else:
+            return None
+        
+        self.icon_atlas.add(key, pixbuf, source, theme)
+        return pixbuf
+
+    def _maintain_icon_atlas(self):
+        """Re-rasterize atlas entries whose source changed, then persist"""
+        for key in self.icon_atlas.stale_keys():
+            icon_string, _, load_size = key.rpartition('@')
+            try:
+                self.rasterize_icon(Gio.Icon.new_for_string(icon_string), int(load_size), key)
+            except Exception:
+                continue
+        self.icon_atlas.save()
+        return False
+
+    def _icon_theme_name(self):
+        settings = Gtk.Settings.get_default()
+        return settings.get_property("gtk-icon-theme-name") if settings else ''
+
     def on_row_activated(self, listbox, row):
         """Handle row activation"""
+        if self.search_entry.get_text():
+            self.record_activation(row)
         if hasattr(row, 'is_category') and row.is_category:
             # Navigate to category
             self.show_category_apps(row.category_name, row.category_apps)
+        elif hasattr(row, 'profile_name'):
+            self.launch_profile(row.profile_name)
+        elif hasattr(row, 'result'):
+            self.activate_result(row.result)
         elif not self.dragging:
             # Launch app
             self.launch_app(row.app_data)
@@ -642,19 +3352,8 @@ class AppLauncher(Gtk.Window):
     
     def on_listbox_motion(self, widget, event):
         """Handle mouse motion over listbox - used during dragging"""
-        if self.dragging and self.drag_row:
-            allocation = self.listbox.get_allocation()
-            row_at_cursor = self.listbox.get_row_at_y(int(event.y))
-            
-            if row_at_cursor and row_at_cursor != self.drag_row:
-                drag_index = self.drag_row.get_index()
-                target_index = row_at_cursor.get_index()
-                
-                if drag_index != target_index:
-                    self.listbox.remove(self.drag_row)
-                    self.listbox.insert(self.drag_row, target_index)
-                    self.listbox.show_all()
-                    self.listbox.select_row(self.drag_row)
+        if self.dragging and self.drag_row and widget is self.listbox:
+            self._queue_drag_motion(event.y)
         
         return False
 
@@ -673,8 +3372,10 @@ class AppLauncher(Gtk.Window):
             self.show_context_menu(row.app_data, event)
             return True
         if event.button == 1:
-            self.dragging = True
-            self.drag_row = row
+            if row.is_draggable:
+                self.dragging = True
+                self.drag_row = row
+                self.drag_target = None
             self.listbox.select_row(row)
         return False
 
@@ -685,29 +3386,128 @@ class AppLauncher(Gtk.Window):
             x, y = widget.translate_coordinates(self.listbox, event.x, event.y)
             
             if x is not None and y is not None:
-                new_event = Gdk.Event.new(Gdk.EventType.MOTION_NOTIFY)
-                new_event.x = x
-                new_event.y = y
-                self.on_listbox_motion(self.listbox, new_event)
+                self._queue_drag_motion(y)
         
         return True
 
+    def _queue_drag_motion(self, y):
+        """Remember the latest pointer position; it is applied on the next frame"""
+        self.drag_pending_y = y
+        if self.drag_tick_id is None:
+            self.drag_tick_listbox = self.listbox
+            self.drag_tick_id = self.listbox.add_tick_callback(self._on_drag_tick)
+
+    def _on_drag_tick(self, widget, frame_clock):
+        y = self.drag_pending_y
+        self.drag_pending_y = None
+        if y is None or not self.dragging:
+            # No motion since the last frame; stop ticking until there is
+            self.drag_tick_id = None
+            return GLib.SOURCE_REMOVE
+        self._update_drag_target(int(y))
+        return GLib.SOURCE_CONTINUE
+
+    def _stop_drag_tick(self):
+        if self.drag_tick_id is not None:
+            self.drag_tick_listbox.remove_tick_callback(self.drag_tick_id)
+            self.drag_tick_id = None
+        self.drag_pending_y = None
+
+    def _update_drag_target(self, y):
+        """Move the placeholder to where the dragged row would land"""
+        row_at_cursor = self.listbox.get_row_at_y(y)
+        if row_at_cursor is None or row_at_cursor is self.drag_placeholder:
+            return
+
+        rows = [c for c in self.listbox.get_children() if c is not self.drag_placeholder]
+        if self.drag_row not in rows:
+            return
+        drag_index = rows.index(self.drag_row)
+        target_index = rows.index(row_at_cursor)
+        if target_index == self.drag_target:
+            return
+        self.drag_target = target_index
+
+        placeholder = self.drag_placeholder
+        if placeholder is None:
+            placeholder = self.drag_placeholder = self._create_drag_placeholder()
+        if placeholder.get_parent():
+            placeholder.get_parent().remove(placeholder)
+
+        self.drag_row.get_style_context().add_class("drag-source")
+        if target_index == drag_index:
+            return
+
+        # Rows below the dragged one shift up when it is taken out
+        placeholder_index = target_index + 1 if target_index > drag_index else target_index
+        placeholder.revealer.get_child().set_size_request(-1, self.drag_row.get_allocated_height())
+        placeholder.revealer.set_reveal_child(False)
+        self.listbox.insert(placeholder, placeholder_index)
+        placeholder.revealer.set_reveal_child(True)
+
+    def _create_drag_placeholder(self):
+        row = Gtk.ListBoxRow()
+        row.set_activatable(False)
+        row.set_selectable(False)
+        row.is_category = False
+        row.get_style_context().add_class("drag-placeholder")
+
+        revealer = Gtk.Revealer()
+        revealer.set_transition_type(Gtk.RevealerTransitionType.SLIDE_DOWN)
+        revealer.set_transition_duration(120)
+        revealer.add(Gtk.Box())
+        row.add(revealer)
+        row.revealer = revealer
+        row.show_all()
+        return row
+
     
     def on_button_release(self, widget, event, row):
         if self.dragging:
             self.dragging = False
+            self._stop_drag_tick()
+
+            placeholder = self.drag_placeholder
+            if placeholder and placeholder.get_parent():
+                placeholder.get_parent().remove(placeholder)
+            self.drag_row.get_style_context().remove_class("drag-source")
+
+            # Commit the move only now; the row keeps its shown state
+            if self.drag_target is not None and self.drag_row.get_parent() is self.listbox:
+                if self.drag_target != self.drag_row.get_index():
+                    self.listbox.remove(self.drag_row)
+                    self.listbox.insert(self.drag_row, self.drag_target)
+                    self.listbox.select_row(self.drag_row)
             
             new_order = []
             for child in self.listbox.get_children():
                 if hasattr(child, 'app_data'):
                     new_order.append(child.app_data['desktop_id'])
             
-            self.favorites = new_order
-            self.save_favorites()
+            if new_order != self.favorites:
+                self.favorites = new_order
+                self.save_favorites()
+                self._set_page_key(self.listbox, ('favorites',))
             self.drag_row = None
+            self.drag_target = None
+            self._install_pending_catalog()
         
         return False
 
+    def cancel_drag(self):
+        """Drop a drag in progress, leaving the rows where they were"""
+        if not self.dragging:
+            return
+        self.dragging = False
+        self._stop_drag_tick()
+        placeholder = self.drag_placeholder
+        if placeholder and placeholder.get_parent():
+            placeholder.get_parent().remove(placeholder)
+        if self.drag_row is not None:
+            self.drag_row.get_style_context().remove_class("drag-source")
+        self.drag_row = None
+        self.drag_target = None
+
     
     def show_context_menu(self, app, event):
         menu = Gtk.Menu()
@@ -716,6 +3516,39 @@ class AppLauncher(Gtk.Window):
         launch_item.connect("activate", lambda item: self.launch_app(app))
         menu.append(launch_item)
 
+        if self.running_window(app):
+            new_window_item = Gtk.MenuItem(label="Open new window")
+            new_window_item.connect("activate", lambda item: self.launch_app(app, new_instance=True))
+            menu.append(new_window_item)
+
+        menu.append(Gtk.SeparatorMenuItem())
+
+        # Launch profiles: membership toggles plus launching whole profiles
+        add_menu = Gtk.Menu()
+        for name in sorted(self.profiles):
+            item = Gtk.CheckMenuItem(label=name)
+            item.set_active(app['desktop_id'] in self.profiles[name])
+            item.connect("toggled", lambda item, n=name: self.toggle_profile_member(n, app))
+            add_menu.append(item)
+        if self.profiles:
+            add_menu.append(Gtk.SeparatorMenuItem())
+        new_item = Gtk.MenuItem(label="New profile…")
+        new_item.connect("activate", lambda item: self.create_profile_dialog(app))
+        add_menu.append(new_item)
+        add_item = Gtk.MenuItem(label="Add to profile")
+        add_item.set_submenu(add_menu)
+        menu.append(add_item)
+
+        if self.profiles:
+            launch_menu = Gtk.Menu()
+            for name in sorted(self.profiles):
+                item = Gtk.MenuItem(label=name)
+                item.connect("activate", lambda item, n=name: self.launch_profile(n))
+                launch_menu.append(item)
+            launch_profile_item = Gtk.MenuItem(label="Launch profile")
+            launch_profile_item.set_submenu(launch_menu)
+            menu.append(launch_profile_item)
+
         menu.append(Gtk.SeparatorMenuItem())
 
         open_location_item = Gtk.MenuItem(label="Open .desktop file location")
@@ -729,10 +3562,29 @@ class AppLauncher(Gtk.Window):
         menu.popup_at_pointer(event)
 
     def _open_file_location(self, desktop_path):
-        directory = str(Path(desktop_path).parent)
+        self.open_path(str(Path(desktop_path).parent))
+
+    def open_with_app(self, desktop_id, path):
+        """Launch an app on a file, or on its own when path is None"""
+        app = self.apps_by_id.get(desktop_id)
+        if app is None:
+            return
+        if path is None:
+            self.launch_app(app)
+            return
+        try:
+            self.app_info_for(app).launch([Gio.File.new_for_path(path)], None)
+        except Exception as e:
+            print(f"Failed to open {path} with {app['name']}: {e}")
+            return
+        self.record_launch(app)
+        self.hide_launcher()
+
+    def open_path(self, target):
+        """Open a file, directory or URI with the desktop's default handler"""
         try:
             subprocess.Popen(
-                ['xdg-open', directory],
+                ['xdg-open', target],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 start_new_session=True
@@ -763,11 +3615,68 @@ class AppLauncher(Gtk.Window):
     
     def on_search_changed(self, entry):
         query = entry.get_text()
+        start = time.monotonic()
         if query:
             self.show_search_results(query)
         else:
             # Return to current view from view_stack
+            self.cancel_search_stream()
+            self.cancel_provider_queries()
             self.restore_current_view()
+        if self.settings['record_queries']:
+            self.record_keystroke(query, start)
+
+    def record_keystroke(self, query, start):
+        """Add a search change and its handler time to the current session"""
+        session = self.query_session
+        if session is None:
+            if not query:
+                return
+            session = self.query_session = {
+                'started': time.time(), 'start': start, 'keys': [], 'activation': None,
+            }
+        session['keys'].append([
+            round((start - session['start']) * 1000, 1),
+            query,
+            round((time.monotonic() - start) * 1000, 3),
+        ])
+
+    def record_activation(self, row):
+        """Note what a recorded session ended with; row None means the query ran as a command"""
+        session = self.query_session
+        if session is None or session['activation'] is not None:
+            return
+        children = self.listbox.get_children()
+        if row is None and len(children) == 1 and hasattr(children[0], 'app_data'):
+            row = children[0]
+
+        if row is None:
+            activation = {'kind': 'command', 'id': self.search_entry.get_text().strip()}
+        elif hasattr(row, 'profile_name'):
+            activation = {'kind': 'profile', 'id': row.profile_name}
+        elif hasattr(row, 'result'):
+            activation = {'kind': 'result', 'id': row.result['title']}
+        elif hasattr(row, 'app_data'):
+            activation = {'kind': 'app', 'id': row.app_data['desktop_id']}
+        else:
+            return
+        activation['text'] = self.search_entry.get_text()
+        activation['rank'] = children.index(row) if row in children else None
+        activation['at'] = round((time.monotonic() - session['start']) * 1000, 1)
+        session['activation'] = activation
+
+    def save_query_session(self):
+        """Append the recorded session to QUERY_LOG_FILE"""
+        session, self.query_session = self.query_session, None
+        if session is None:
+            return
+        del session['start']
+        try:
+            QUERY_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(QUERY_LOG_FILE, 'a') as f:
+                f.write(json.dumps(session) + '\n')
+        except OSError as e:
+            print(f"Failed to write query log: {e}")
 
     def restore_current_view(self):
         """Restore the current view after clearing search"""
@@ -782,54 +3691,24 @@ class AppLauncher(Gtk.Window):
             self.listbox.remove(child)
 
         if current[0] == 'favorites':
-            # Repopulate with favorites
-            for desktop_id in self.favorites:
-                app = next((a for a in self.all_apps if a['desktop_id'] == desktop_id), None)
-                if app:
-                    row = self.create_app_row(app, is_favorite=True, draggable=True)
-                    self.listbox.add(row)
+            self._populate_favorites(self.listbox)
+            self._set_page_key(self.listbox, ('favorites',))
             self.rebuild_nav_button("forward", "All Applications", "folder", self.show_categories_view)
 
         elif current[0] == 'categories':
-            # Repopulate with categories
-            category_icons = {
-                'Multimedia': 'applications-multimedia',
-                'Development': 'applications-development',
-                'Education': 'applications-science',
-                'Games': 'applications-games',
-                'Graphics': 'applications-graphics',
-                'Internet': 'applications-internet',
-                'Office': 'applications-office',
-                'Science': 'applications-science',
-                'Settings': 'preferences-system',
-                'System Tools': 'applications-system',
-                'Accessories': 'applications-accessories',
-                'Other': 'applications-other',
-            }
-
-            # Add "All Applications" entry first
-            all_apps_row = self.create_category_row("All Applications", "applications-other", self.all_apps)
-            self.listbox.add(all_apps_row)
-
-            for category in sorted(self.categories.keys()):
-                apps = self.categories[category]
-                if apps:
-                    row = self.create_category_row(category, category_icons.get(category, 'folder'), apps)
-                    self.listbox.add(row)
-
+            self._populate_categories(self.listbox)
+            self._set_page_key(self.listbox, ('categories',))
             self.rebuild_nav_button("back", "Back", "go-previous", self.go_back)
 
         elif current[0] == 'category':
-            # Repopulate with category apps
             category_name, apps = current[1], current[2]
-            for app in sorted(apps, key=lambda x: x['name'].lower()):
-                is_fav = app['desktop_id'] in self.favorites
-                row = self.create_app_row(app, is_favorite=is_fav, draggable=False)
-                self.listbox.add(row)
+            self._populate_category_apps(self.listbox, apps)
+            self._set_page_key(self.listbox, ('category', category_name))
             self.rebuild_nav_button("back", "Back", "go-previous", self.go_back)
 
         self.listbox.show_all()
-        GLib.idle_add(self._select_first_row)
+        self.wakeups.idle_add(self._select_first_row)
+        self.predict_next_view()
 
 
     def on_search_activate(self, entry):
@@ -838,7 +3717,19 @@ class AppLauncher(Gtk.Window):
         if not query:
             return
 
+        # Keyword and typo-tolerant matches may still be queued; a query
+        # only goes to the shell when no app matches it at all
+        self.finish_search_stream()
         selected_row = self.listbox.get_selected_row()
+        self.record_activation(selected_row)
+
+        if selected_row and hasattr(selected_row, 'profile_name'):
+            self.launch_profile(selected_row.profile_name)
+            return
+
+        if selected_row and hasattr(selected_row, 'result'):
+            self.activate_result(selected_row.result)
+            return
 
         if selected_row and hasattr(selected_row, 'app_data'):
             self.launch_app(selected_row.app_data)
@@ -851,54 +3742,142 @@ class AppLauncher(Gtk.Window):
             return
         
         if query:
-            try:
-                subprocess.Popen(
-                    ['fish', '-c', query],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    start_new_session=True
-                )
-                self.hide_launcher()
-            except Exception:
-                pass
+            self.run_command(query)
+
+    def run_command(self, command):
+        try:
+            subprocess.Popen(
+                ['fish', '-c', command],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+            self.hide_launcher()
+        except Exception:
+            pass
+
+    def activate_result(self, result):
+        """Perform a search provider result's action"""
+        kind, value = result['action']
+        if kind == 'run':
+            self.run_command(value)
+        elif kind == 'open':
+            self.open_path(value)
+            self.hide_launcher()
+        elif kind == 'open_with':
+            self.open_with_app(*value)
+        elif kind == 'copy':
+            clipboard = Gtk.Clipboard.get(Gdk.SELECTION_CLIPBOARD)
+            clipboard.set_text(value, -1)
+            clipboard.store()
+            self.hide_launcher()
 
     
-    def search_apps(self, query):
-        query = query.lower()
+    def iter_search_tiers(self, query):
+        """Yield batches of apps matching an already-lowercased query, best first.
+
+        The first batch holds every exact and title match. Description and
+        keyword matches follow in batches of up to SEARCH_CHUNK_SIZE scanned
+        apps, and typo-tolerant matches come last, only if nothing else
+        matched.
+        """
+        apps = self.all_apps
         exact_matches = []
         title_matches = []
-        other_matches = []
-        
-        for app in self.all_apps:
+        for app in apps:
             name_lower = app['name'].lower()
             
             # Check for exact match first
             if name_lower == query:
                 exact_matches.append(app)
-                continue
-            
             # Check if query is in the title
-            if query in name_lower:
+            elif query in name_lower:
                 title_matches.append(app)
-                continue
-            
-            # Check other fields
-            search_text = ' '.join([
-                app['description'].lower(),
-                app['keywords'],
-                app['generic_name']
-            ])
-            
-            if query in search_text:
-                other_matches.append(app)
-        
-        # Combine results with title matches first
-        return exact_matches + title_matches + other_matches
+        found = bool(exact_matches or title_matches)
+        yield exact_matches + title_matches
+
+        # Check other fields
+        other_matches = []
+        for start in range(0, len(apps), SEARCH_CHUNK_SIZE):
+            for app in apps[start:start + SEARCH_CHUNK_SIZE]:
+                if query in app['name'].lower():
+                    continue
+                search_text = ' '.join([
+                    app['description'].lower(),
+                    app['keywords'],
+                    app['generic_name']
+                ])
+                if query in search_text:
+                    other_matches.append(app)
+            found = found or bool(other_matches)
+            yield other_matches
+            other_matches = []
+
+        if not found:
+            yield from self._iter_fuzzy_apps(query)
+
+    def _iter_fuzzy_apps(self, query):
+        """Typo-tolerant fallback: apps with a word within a small edit distance.
+
+        Yields empty batches while the index is still being built or
+        searched, so the search stream can end its slice, then the apps.
+        """
+        query = query.strip()
+        if len(query) < FUZZY_MIN_LENGTH or ' ' in query:
+            return
+
+        while self.fuzzy is None or self.fuzzy[0] is not self.all_apps:
+            self.ensure_fuzzy_index()
+            self.fuzzy_thread.join(SEARCH_SLICE_SECONDS)
+            if self.fuzzy_thread.is_alive():
+                yield []
+            elif self.fuzzy is None or self.fuzzy[0] is not self.all_apps:
+                # The build failed; no typo-tolerant matches this time
+                return
+        _, index, words = self.fuzzy
+
+        max_distance = 1 if len(query) <= 4 else 2 if len(query) <= 8 else 3
+        for found in index.search_steps(query, max_distance):
+            if found is None:
+                yield []
+        ranked = {}
+        for distance, word in found:
+            for desktop_id, in_name in words[word]:
+                rank = (distance, not in_name)
+                if desktop_id not in ranked or rank < ranked[desktop_id]:
+                    ranked[desktop_id] = rank
+
+        apps = [self.apps_by_id[d] for d in ranked]
+        yield sorted(apps, key=lambda a: (ranked[a['desktop_id']], a['name'].lower()))
+
+    def ensure_fuzzy_index(self):
+        """Start building the typo index of the current catalog unless it exists or is underway"""
+        apps = self.all_apps
+        if (self.fuzzy is not None and self.fuzzy[0] is apps) or self.fuzzy_building is apps:
+            return
+        self.fuzzy_building = apps
+        self.fuzzy_thread = threading.Thread(target=self._build_fuzzy_index, args=(apps,), daemon=True)
+        self.fuzzy_thread.start()
+
+    def _build_fuzzy_index(self, apps):
+        """BK-tree over name, generic name and keyword words of the catalog"""
+        words = defaultdict(set)
+        for app in apps:
+            name = app['name'].lower()
+            for word in [name] + name.split():
+                if len(word) >= FUZZY_MIN_LENGTH:
+                    words[word].add((app['desktop_id'], True))
+            for word in (app['generic_name'] + ' ' + app['keywords']).split():
+                if len(word) >= FUZZY_MIN_LENGTH:
+                    words[word].add((app['desktop_id'], False))
+        # One assignment, so readers never pair a tree with another catalog's words
+        self.fuzzy = (apps, BKTree(words), words)
 
     
-    def launch_app(self, app):
+    def spawn_app(self, app):
+        """Start an app without touching the UI; safe to call off the main loop"""
         methods = [
-            lambda: app['app_info'].launch([], None),
+            lambda: self.app_info_for(app).launch([], None),
             lambda: subprocess.Popen(
                 ['gtk-launch', app['desktop_id']],
                 stdout=subprocess.DEVNULL,
@@ -916,14 +3895,286 @@ class AppLauncher(Gtk.Window):
         for method in methods:
             try:
                 method()
-                self.hide_launcher()
-                return
+                return True
             except Exception:
                 continue
         
+        return False
+
+    def launch_app(self, app, new_instance=False):
+        window = None if new_instance else self.running_window(app)
+        if window is not None:
+            # The IPC round trip may take up to half a second; keep it off the main loop
+            self.hide_launcher()
+            threading.Thread(target=self._focus_or_spawn, args=(app, window['id']), daemon=True).start()
+            return
+        
+        if self.spawn_app(app):
+            self.record_launch(app)
+            self.hide_launcher()
+            return
+        
         print(f"Failed to launch: {app['name']}")
 
+    def _focus_or_spawn(self, app, window_id):
+        """Worker: focus the app's window, or start the app if that fails"""
+        if self.window_provider.focus(window_id):
+            return
+        if self.spawn_app(app):
+            self.wakeups.idle_add(self.record_launch, app)
+        else:
+            print(f"Failed to launch: {app['name']}")
+
+    def record_launch(self, app):
+        if self.prefetcher is None:
+            return
+        self.prefetcher.record_launch(app['desktop_id'])
+        entry = self.launch_history.setdefault(app['desktop_id'], {'count': 0, 'last': 0})
+        entry['count'] += 1
+        entry['last'] = time.time()
+        self.save_launch_history()
+
+    def prefetch_likely_apps(self):
+        """Warm the top-N apps by decayed launch count, favorites included"""
+        if self.prefetcher is None:
+            return
+        now = time.time()
+        scores = defaultdict(float)
+        for desktop_id in self.favorites:
+            scores[desktop_id] += 1.0
+        for desktop_id, entry in self.launch_history.items():
+            age_days = (now - entry.get('last', 0)) / 86400
+            scores[desktop_id] += entry.get('count', 0) * 0.5 ** (age_days / 14)
+        ranked = sorted((d for d in scores if d in self.apps_by_id), key=scores.get, reverse=True)
+        self.prefetcher.request([self.apps_by_id[d] for d in ranked[:self.settings['prefetch_top_n']]])
+
     
+    def running_window(self, app):
+        if self.window_provider is None or not self.window_provider.connected:
+            return None
+        return self.window_provider.find_window(self.app_ids_for(app))
+
+    def app_ids_for(self, app):
+        """Window app-ids an app's windows may carry (lowercase)"""
+        desktop_id = app['desktop_id']
+        if desktop_id.endswith(".desktop"):
+            desktop_id = desktop_id[:-len(".desktop")]
+        app_ids = {desktop_id.lower()}
+        try:
+            wm_class = self.app_info_for(app).get_startup_wm_class()
+        except Exception:
+            wm_class = None
+        if wm_class:
+            app_ids.add(wm_class.lower())
+        return app_ids
+
+    def search_profiles(self, query):
+        """Profiles whose name starts with the query"""
+        query = query.strip().lower()
+        return [name for name in sorted(self.profiles) if name.lower().startswith(query)]
+
+    def launch_profile(self, profile_name):
+        """Spawn every member of a profile concurrently, off the main loop"""
+        members = self.profiles.get(profile_name, [])
+        if not members:
+            return
+        self.hide_launcher()
+        threading.Thread(
+            target=self._run_profile,
+            args=(profile_name, members),
+            daemon=True
+        ).start()
+
+    def _run_profile(self, profile_name, members):
+        results = []
+        start = time.perf_counter()
+
+        def spawn(desktop_id):
+            app = self.apps_by_id.get(desktop_id)
+            if app is None:
+                return desktop_id, None, "not installed"
+            t0 = time.perf_counter()
+            ok = self.spawn_app(app)
+            return app['name'], (time.perf_counter() - t0) * 1000, None if ok else "spawn failed"
+
+        with ThreadPoolExecutor(max_workers=len(members)) as pool:
+            for future in as_completed([pool.submit(spawn, d) for d in members]):
+                results.append(future.result())
+
+        report = {
+            'profile': profile_name,
+            'total_ms': round((time.perf_counter() - start) * 1000, 1),
+            'apps': [{'name': name, 'spawn_ms': round(ms, 1) if ms is not None else None, 'error': error}
+                     for name, ms, error in results],
+        }
+        self.wakeups.idle_add(self._on_profile_launched, report)
+
+    def _on_profile_launched(self, report):
+        self.last_profile_report = report
+        print(f"Profile '{report['profile']}' launched in {report['total_ms']} ms")
+        for entry in report['apps']:
+            if entry['error']:
+                print(f"  Failed to launch: {entry['name']} ({entry['error']})")
+            else:
+                print(f"  {entry['name']}: {entry['spawn_ms']} ms")
+        return False
+
+    def toggle_profile_member(self, profile_name, app):
+        members = self.profiles.setdefault(profile_name, [])
+        if app['desktop_id'] in members:
+            members.remove(app['desktop_id'])
+            if not members:
+                del self.profiles[profile_name]
+        else:
+            members.append(app['desktop_id'])
+        self.save_profiles()
+
+    def create_profile_dialog(self, app):
+        """Ask for a profile name and create it with app as first member"""
+        dialog = Gtk.Dialog(title="New launch profile", transient_for=self, modal=True)
+        dialog.add_buttons("Cancel", Gtk.ResponseType.CANCEL, "Create", Gtk.ResponseType.OK)
+        dialog.set_default_response(Gtk.ResponseType.OK)
+        entry = Gtk.Entry()
+        entry.set_placeholder_text("Profile name")
+        entry.set_activates_default(True)
+        dialog.get_content_area().pack_start(entry, True, True, 5)
+        dialog.show_all()
+
+        # The dialog takes focus; don't let focus-out hide the launcher
+        self.modal_open = True
+        response = dialog.run()
+        name = entry.get_text().strip()
+        dialog.destroy()
+        self.modal_open = False
+        self.present()
+
+        if response == Gtk.ResponseType.OK and name:
+            members = self.profiles.setdefault(name, [])
+            if app['desktop_id'] not in members:
+                members.append(app['desktop_id'])
+            self.save_profiles()
+
+    
+    def watch_application_dirs(self):
+        """File monitors on the application directories that exist"""
+        monitors = []
+        for app_dir in xdg_application_dirs():
+            if not os.path.isdir(app_dir):
+                continue
+            try:
+                monitor = Gio.File.new_for_path(app_dir).monitor_directory(
+                    Gio.FileMonitorFlags.WATCH_MOVES, None)
+            except Exception:
+                continue
+            monitor.connect("changed", self._on_app_dir_changed)
+            monitors.append(monitor)
+        return monitors
+
+    def _on_app_dir_changed(self, monitor, file, other_file, event_type):
+        self.wakeups.note('app-dir-monitor')
+        # Writes end with CHANGES_DONE_HINT; don't act on every chunk
+        if event_type != Gio.FileMonitorEvent.CHANGED:
+            self.run_when_visible(self._schedule_catalog_reload)
+
+    def _schedule_catalog_reload(self):
+        """Reload the catalog once a burst of directory changes has settled"""
+        if self.catalog_reload_source:
+            GLib.source_remove(self.catalog_reload_source)
+        self.catalog_reload_source = self.wakeups.timeout_add(500, self._reload_after_changes)
+
+    def _reload_after_changes(self):
+        if self.catalog_loading:
+            # The load in flight may predate the changes; try again after it
+            return True
+        self.catalog_reload_source = None
+        self.reload_catalog()
+        return False
+
+    def reload_catalog(self):
+        """Load the catalog on a worker thread and swap it in when done"""
+        if self.catalog_loading:
+            return
+        self.catalog_loading = True
+        threading.Thread(target=self._load_catalog_worker, daemon=True).start()
+
+    def _load_catalog_worker(self):
+        try:
+            apps = self.load_applications()
+        except Exception as e:
+            print(f"Failed to load applications: {e}")
+            apps = None
+        self.wakeups.idle_add(self._on_catalog_loaded, apps)
+
+    def _on_catalog_loaded(self, apps):
+        if apps is None:
+            self.catalog_loading = False
+            return False
+        if self.dragging or self.is_animating:
+            # Don't pull rows out from under a drag or a slide; whichever
+            # ends it installs the catalog
+            self.pending_catalog = apps
+            return False
+        self.catalog_loading = False
+        self.apps_loaded = True
+
+        snapshot = catalog_snapshot(apps)
+        if snapshot == catalog_snapshot(self.all_apps):
+            # Same catalog: just attach the parsed app infos, keep every view
+            for app in apps:
+                current = self.apps_by_id.get(app['desktop_id'])
+                if current is not None:
+                    current['app_info'] = app['app_info']
+                    current['icon'] = app['icon']
+            # mimeapps.list may have changed even if the catalog did not
+            self.update_mime_index()
+            return False
+
+        self.set_catalog(apps)
+        threading.Thread(target=write_catalog_snapshot, args=(snapshot, self.snapshot_file),
+                         daemon=True).start()
+
+        # Category views hold app lists from the old catalog
+        self.view_stack = [
+            ('category', entry[1], self._category_apps(entry[1]) or [])
+            if entry[0] == 'category' else entry
+            for entry in self.view_stack
+        ]
+        query = self.search_entry.get_text()
+        if query:
+            self.show_search_results(query)
+        elif self._visible:
+            self.restore_current_view()
+        return False
+
+    def _install_pending_catalog(self):
+        apps, self.pending_catalog = self.pending_catalog, None
+        if apps is not None:
+            self._on_catalog_loaded(apps)
+
+    def app_info_for(self, app):
+        """The app's Gio.DesktopAppInfo, created on demand for snapshot entries"""
+        if app['app_info'] is None:
+            app['app_info'] = Gio.DesktopAppInfo.new_from_filename(app['desktop_path'])
+        return app['app_info']
+
+    def set_catalog(self, apps):
+        """Install a new application list and invalidate derived state"""
+        self.all_apps = apps
+        self.apps_by_id = {app['desktop_id']: app for app in apps}
+        self.categories = self.organize_by_category()
+        self.update_mime_index()
+        self.ensure_fuzzy_index()
+        self.catalog_generation += 1
+
+    def update_mime_index(self):
+        """Rebuild the MIME type -> apps index from the catalog and mimeapps.list"""
+        providers = [p for p in self.search_providers if isinstance(p, OpenWithProvider)]
+        if not providers:
+            return
+        index = MimeIndex(self.all_apps, read_mimeapps_lists(mimeapps_list_files()))
+        for provider in providers:
+            provider.index = index
+
     def organize_by_category(self):
         """Organize applications by their categories"""
         categories = defaultdict(list)
@@ -946,8 +4197,7 @@ class AppLauncher(Gtk.Window):
         }
         
         for app in self.all_apps:
-            app_info = app['app_info']
-            app_categories = app_info.get_categories()
+            app_categories = app['categories']
             
             if not app_categories:
                 categories['Other'].append(app)
@@ -980,79 +4230,73 @@ class AppLauncher(Gtk.Window):
         return []
 
     
+    def load_settings(self):
+        settings = dict(DEFAULT_SETTINGS)
+        if SETTINGS_FILE.exists():
+            try:
+                with open(SETTINGS_FILE) as f:
+                    settings.update(json.load(f))
+            except:
+                pass
+        return settings
+
+    
+    def load_launch_history(self):
+        try:
+            with open(self.launch_history_file) as f:
+                history = json.load(f)
+            if isinstance(history, dict):
+                return history
+        except:
+            pass
+        return {}
+
+    
+    def save_launch_history(self):
+        try:
+            self.launch_history_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.launch_history_file, 'w') as f:
+                json.dump(self.launch_history, f)
+        except OSError:
+            pass
+
+    
+    def load_profiles(self):
+        if PROFILES_FILE.exists():
+            try:
+                with open(PROFILES_FILE) as f:
+                    profiles = json.load(f)
+                if isinstance(profiles, dict):
+                    return profiles
+            except:
+                return {}
+        return {}
+
+    
+    def save_profiles(self):
+        PROFILES_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(PROFILES_FILE, 'w') as f:
+            json.dump(self.profiles, f, indent=2)
+
+    
     def save_favorites(self):
         FAVORITES_FILE.parent.mkdir(parents=True, exist_ok=True)
         with open(FAVORITES_FILE, 'w') as f:
             json.dump(self.favorites, f, indent=2)
+        self.catalog_generation += 1
 
     
     def load_applications(self):
-        apps_by_id = {}
-        
-        search_paths = [
-            (Path.home() / ".local/share/applications", 4),
-            (Path.home() / ".local/share/flatpak/exports/share/applications", 3),
-            (Path("/usr/share/applications"), 2),
-            (Path("/var/lib/flatpak/exports/share/applications"), 1),
-        ]
-        
-        for search_path, priority in search_paths:
-            if not search_path.exists():
-                continue
-            
-            for desktop_file in search_path.glob("*.desktop"):
-                try:
-                    desktop_id = desktop_file.name
-                    id_key = desktop_id.lower()
-                    
-                    # If we already processed this desktop_id with higher priority, skip
-                    if id_key in apps_by_id and apps_by_id[id_key]['priority'] >= priority:
-                        continue
-                    
-                    app_info = Gio.DesktopAppInfo.new_from_filename(str(desktop_file))
-                    
-                    # Check if hidden or nodisplay
-                    if not app_info or app_info.get_nodisplay() or app_info.get_is_hidden():
-                        # Mark as hidden so lower priority versions don't show up
-                        apps_by_id[id_key] = {
-                            'hidden': True,
-                            'priority': priority
-                        }
-                        continue
-                    
-                    name = app_info.get_name()
-                    
-                    if not name:
-                        continue
-                    
-                    app_data = {
-                        'name': name,
-                        'description': app_info.get_description() or '',
-                        'icon': app_info.get_icon(),
-                        'desktop_id': desktop_id,
-                        'desktop_path': str(desktop_file),
-                        'app_info': app_info,
-                        'keywords': ' '.join(app_info.get_keywords() or []).lower(),
-                        'generic_name': (app_info.get_generic_name() or '').lower(),
-                        'priority': priority,
-                        'hidden': False
-                    }
-                    
-                    apps_by_id[id_key] = app_data
-                
-                except Exception:
-                    continue
-        
-        # Filter out hidden entries
-        unique_apps = [app for app in apps_by_id.values() if not app.get('hidden', False)]
-        return sorted(unique_apps, key=lambda x: x['name'].lower())
+        return self.app_scanner.load(xdg_application_dirs())
 
     
     def on_focus_out(self, widget, event):
+        if self.modal_open or not self._visible:
+            return False
         if self.focus_out_timeout:
             GLib.source_remove(self.focus_out_timeout)
 
-        self.focus_out_timeout = GLib.timeout_add(500, self._delayed_hide)
+        self.focus_out_timeout = self.wakeups.timeout_add(500, self._delayed_hide)
         return False
 
 
@@ -1066,6 +4310,8 @@ class AppLauncher(Gtk.Window):
 
 
     def _delayed_hide(self):
+        # The source is done once this returns; hide_launcher must not remove it
+        self.focus_out_timeout = None
         self.hide_launcher()
         return False
 
@@ -1140,10 +4386,16 @@ def on_toggle_signal(sig, frame):
         GLib.idle_add(_launcher.toggle_visibility)
 
 
+def on_wakeup_report_signal(sig, frame):
+    if _launcher:
+        GLib.idle_add(_launcher.dump_wakeups)
+
+
 if __name__ == "__main__":
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGUSR1, on_toggle_signal)
+    signal.signal(signal.SIGUSR2, on_wakeup_report_signal)
     check_single_instance()
 
     _launcher = AppLauncher()
@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""Benchmarks for pylauncher.
+
+Every subcommand prints a single JSON document so runs can be diffed
+across commits, e.g.:
+
+    ./pylauncher_bench.py discovery --apps 20000 > before.json
+    ./pylauncher_bench.py ui --backend broadway > before-ui.json
+    ./pylauncher_bench.py replay --backend broadway > before-replay.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent,
+            capture_output=True, text=True
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def summarize(samples_ms):
+    samples = sorted(samples_ms)
+    if not samples:
+        return {'n': 0}
+
+    def pct(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))], 3)
+
+    return {
+        'n': len(samples),
+        'min': round(samples[0], 3),
+        'median': round(statistics.median(samples), 3),
+        'p90': pct(0.90),
+        'p99': pct(0.99),
+        'max': round(samples[-1], 3),
+    }
+
+
+def timed(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples), result
+
+
+def make_synthetic_tree(root, apps, data_dirs=4, nested_every=10, duplicate_every=7):
+    """Create data_dirs XDG data directories holding `apps` desktop entries.
+
+    Every nested_every-th entry lives in a vendor subdirectory (giving a
+    prefixed desktop ID) and every duplicate_every-th entry is shadowed by
+    a copy in a lower-precedence directory.
+    """
+    root = Path(root)
+    categories = ['Utility', 'Development', 'Game', 'Graphics', 'Network', 'Office', 'AudioVideo']
+    roots = [root / f"data{d}" for d in range(data_dirs)]
+    for data_root in roots:
+        (data_root / "applications").mkdir(parents=True, exist_ok=True)
+
+    for i in range(apps):
+        data_root = roots[i % data_dirs]
+        app_dir = data_root / "applications"
+        if i % nested_every == 0:
+            app_dir = app_dir / f"vendor{i % 3}"
+            app_dir.mkdir(exist_ok=True)
+        entry = (
+            "[Desktop Entry]\n"
+            "Type=Application\n"
+            f"Name=Synthetic App {i}\n"
+            f"GenericName=Tool number {i}\n"
+            f"Comment=Benchmark entry {i} for the launcher\n"
+            f"Keywords=bench;synthetic;item{i};\n"
+            "Exec=true\n"
+            "Icon=application-x-executable\n"
+            f"Categories={categories[i % len(categories)]};\n"
+        )
+        (app_dir / f"bench-app-{i}.desktop").write_text(entry)
+        if i % duplicate_every == 0 and data_dirs > 1:
+            shadow_dir = roots[(i + 1) % data_dirs] / app_dir.relative_to(data_root)
+            shadow_dir.mkdir(parents=True, exist_ok=True)
+            (shadow_dir / f"bench-app-{i}.desktop").write_text(entry.replace("Synthetic", "Shadowed"))
+
+    return roots
+
+
+def bench_discovery(args):
+    import pylauncher
+
+    with tempfile.TemporaryDirectory(prefix="pylauncher-bench-") as tmp:
+        roots = make_synthetic_tree(tmp, args.apps, data_dirs=args.data_dirs)
+        app_dirs = [str(r / "applications") for r in roots]
+
+        scanner = pylauncher.ApplicationScanner()
+        scan_cold, found = timed(lambda: pylauncher.ApplicationScanner().scan(app_dirs), args.repeat)
+        scanner.scan(app_dirs)
+        scan_warm, _ = timed(lambda: scanner.scan(app_dirs), args.repeat)
+
+        load_cold, apps = timed(lambda: pylauncher.ApplicationScanner().load(app_dirs), args.repeat)
+        scanner.load(app_dirs)
+        load_warm, _ = timed(lambda: scanner.load(app_dirs), args.repeat)
+
+        # Touch 1% of the entries and measure the incremental reload
+        touched = sorted(found.values())[::100]
+        for path in touched:
+            os.utime(path, None)
+        load_touched, _ = timed(lambda: scanner.load(app_dirs), 1)
+
+    return {
+        'benchmark': 'discovery',
+        'revision': git_revision(),
+        'apps': args.apps,
+        'data_dirs': args.data_dirs,
+        'desktop_ids': len(found),
+        'visible_apps': len(apps),
+        'scan_cold_ms': scan_cold,
+        'scan_warm_ms': scan_warm,
+        'load_cold_ms': load_cold,
+        'load_warm_ms': load_warm,
+        'load_after_touch_ms': load_touched,
+        'touched_files': len(touched),
+    }
+
+
+def start_backend(backend, display):
+    """Point GDK at a headless backend; must run before Gtk is imported"""
+    if backend == 'current':
+        return None
+    if not shutil.which('broadwayd'):
+        sys.exit("broadwayd not found; install GTK's broadway backend or use --backend current")
+    proc = subprocess.Popen(['broadwayd', display],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    if proc.poll() is not None:
+        sys.exit(f"broadwayd {display} exited with status {proc.returncode}")
+    os.environ['GDK_BACKEND'] = 'broadway'
+    os.environ['BROADWAY_DISPLAY'] = display
+    return proc
+
+
+def build_launcher(app_dirs, favorites_file, cache_dir):
+    """Construct an AppLauncher over the given catalog with no desktop side effects.
+
+    Caches go to cache_dir, and no search providers run: they would sweep
+    $HOME, build indexes and copy browser databases during the timings.
+    """
+    import pylauncher
+
+    pylauncher.FAVORITES_FILE = Path(favorites_file)
+
+    class BenchLauncher(pylauncher.AppLauncher):
+        def load_applications(self):
+            if app_dirs is None:
+                return super().load_applications()
+            return self.app_scanner.load(app_dirs)
+
+        def load_settings(self):
+            settings = super().load_settings()
+            settings['record_queries'] = False
+            return settings
+
+        def _signal_waybar(self):
+            pass
+
+    cache_dir = Path(cache_dir)
+    return BenchLauncher(snapshot_file=cache_dir / "catalog.json", search_providers=[],
+                         icon_atlas_file=cache_dir / "icon-atlas.bin",
+                         launch_history_file=cache_dir / "launch-history.json")
+
+
+def settle():
+    """Run the main loop until no events or idle work is pending"""
+    from gi.repository import Gtk
+    while Gtk.events_pending():
+        Gtk.main_iteration_do(False)
+
+
+def wait_for_frame(widget, timeout=2.0):
+    """Block until the widget's frame clock has painted; return the paint time"""
+    from gi.repository import Gtk, GLib
+
+    painted = []
+    clock = widget.get_frame_clock()
+    handler = clock.connect('after-paint', lambda c: painted.append(time.perf_counter()))
+    widget.queue_draw()
+    timer = GLib.timeout_add(int(timeout * 1000), lambda: painted.append(None) or False)
+    while not painted:
+        Gtk.main_iteration_do(True)
+    clock.disconnect(handler)
+    if painted[0] is not None:
+        GLib.source_remove(timer)
+    return painted[0]
+
+
+def wait_for_animation(launcher, timeout=2.0):
+    from gi.repository import Gtk
+    deadline = time.perf_counter() + timeout
+    while launcher.is_animating and time.perf_counter() < deadline:
+        Gtk.main_iteration_do(True)
+    settle()
+    return time.perf_counter()
+
+
+def typing_sequences(query):
+    return [query[:i] for i in range(1, len(query) + 1)]
+
+
+def bench_ui(args):
+    backend_proc = start_backend(args.backend, args.display)
+    try:
+        with tempfile.TemporaryDirectory(prefix="pylauncher-bench-") as tmp:
+            roots = make_synthetic_tree(tmp, args.apps, data_dirs=args.data_dirs)
+            app_dirs = [str(r / "applications") for r in roots]
+            favorites_file = Path(tmp) / "favorites.json"
+            favorites_file.write_text(json.dumps(
+                [f"bench-app-{i}.desktop" for i in range(1, args.favorites + 1)]))
+            return run_ui_benchmark(args, app_dirs, favorites_file, Path(tmp) / "cache")
+    finally:
+        if backend_proc:
+            backend_proc.terminate()
+            backend_proc.wait()
+
+
+def run_ui_benchmark(args, app_dirs, favorites_file, cache_dir):
+    import pylauncher
+    from gi.repository import Gtk
+
+    # Start the way a normal run does: paint from a snapshot, revalidate in the background
+    apps = pylauncher.ApplicationScanner().load(app_dirs)
+    pylauncher.write_catalog_snapshot(pylauncher.catalog_snapshot(apps), Path(cache_dir) / "catalog.json")
+
+    start = time.perf_counter()
+    launcher = build_launcher(app_dirs, favorites_file, cache_dir)
+    constructed = time.perf_counter()
+    first_frame = wait_for_frame(launcher)
+    while launcher.catalog_loading:
+        Gtk.main_iteration_do(True)
+    settle()
+
+    toggle = []
+    for _ in range(args.repeat):
+        launcher.hide_launcher()
+        settle()
+        t0 = time.perf_counter()
+        launcher.show_launcher()
+        painted = wait_for_frame(launcher)
+        if painted:
+            toggle.append((painted - t0) * 1000)
+        settle()
+
+    handler, rendered = [], []
+    for query in args.queries:
+        for _ in range(args.repeat):
+            for text in typing_sequences(query):
+                t0 = time.perf_counter()
+                launcher.search_entry.set_text(text)
+                t1 = time.perf_counter()
+                painted = wait_for_frame(launcher)
+                handler.append((t1 - t0) * 1000)
+                if painted:
+                    rendered.append((painted - t0) * 1000)
+            launcher.search_entry.set_text("")
+            settle()
+
+    nav_first, nav_done, back_first = [], [], []
+    category = sorted(launcher.categories)[0] if launcher.categories else None
+    for _ in range(args.repeat):
+        steps = [launcher.show_categories_view]
+        if category:
+            steps.append(lambda: launcher.show_category_apps(category, launcher.categories[category]))
+        for step in steps:
+            t0 = time.perf_counter()
+            step()
+            painted = wait_for_frame(launcher)
+            done = wait_for_animation(launcher)
+            if painted:
+                nav_first.append((painted - t0) * 1000)
+            nav_done.append((done - t0) * 1000)
+        while len(launcher.view_stack) > 1:
+            t0 = time.perf_counter()
+            launcher.go_back()
+            painted = wait_for_frame(launcher)
+            wait_for_animation(launcher)
+            if painted:
+                back_first.append((painted - t0) * 1000)
+
+    search_cache = launcher.search_cache.stats()
+    launcher.destroy()
+    return {
+        'benchmark': 'ui',
+        'revision': git_revision(),
+        'backend': args.backend,
+        'apps': len(launcher.all_apps),
+        'favorites': len(launcher.favorites),
+        'construct_ms': round((constructed - start) * 1000, 3),
+        'construct_to_first_frame_ms': round(((first_frame or constructed) - start) * 1000, 3),
+        'toggle_to_first_frame_ms': summarize(toggle),
+        'keystroke_handler_ms': summarize(handler),
+        'keystroke_to_rendered_ms': summarize(rendered),
+        'navigate_to_first_frame_ms': summarize(nav_first),
+        'navigate_to_settled_ms': summarize(nav_done),
+        'back_to_first_frame_ms': summarize(back_first),
+        'search_cache': search_cache,
+    }
+
+
+def default_query_log():
+    # pylauncher.QUERY_LOG_FILE, without importing Gtk before the backend is chosen
+    data_home = os.environ.get('XDG_DATA_HOME') or Path.home() / ".local/share"
+    return Path(data_home) / "pylauncher" / "query-log.jsonl"
+
+
+def read_query_log(path):
+    sessions = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    session = json.loads(line)
+                except ValueError:
+                    continue
+                if session.get('keys'):
+                    sessions.append(session)
+    except OSError as e:
+        sys.exit(f"Cannot read query log {path}: {e}")
+    return sessions
+
+
+def row_identity(row):
+    """(kind, id) of a result row, as recorded by AppLauncher.record_activation"""
+    if hasattr(row, 'profile_name'):
+        return 'profile', row.profile_name
+    if hasattr(row, 'result'):
+        return 'result', row.result['title']
+    if hasattr(row, 'app_data'):
+        return 'app', row.app_data['desktop_id']
+    return None, None
+
+
+def bench_replay(args):
+    sessions = read_query_log(args.log or default_query_log())
+    if args.sessions:
+        sessions = sessions[-args.sessions:]
+    backend_proc = start_backend(args.backend, args.display)
+    try:
+        with tempfile.TemporaryDirectory(prefix="pylauncher-bench-") as tmp:
+            favorites_file = Path(tmp) / "favorites.json"
+            import pylauncher
+            if pylauncher.FAVORITES_FILE.exists():
+                shutil.copy(pylauncher.FAVORITES_FILE, favorites_file)
+            return run_replay(args, sessions, favorites_file, Path(tmp) / "cache")
+    finally:
+        if backend_proc:
+            backend_proc.terminate()
+            backend_proc.wait()
+
+
+def run_replay(args, sessions, favorites_file, cache_dir):
+    """Feed recorded sessions through the real search and rendering path.
+
+    Keystrokes are replayed back to back unless --realtime is given, in
+    which case the recorded gaps are reproduced while the main loop runs,
+    so provider results and idle work land between keys as they did live.
+    """
+    from gi.repository import Gtk
+
+    launcher = build_launcher(None, favorites_file, cache_dir)
+    wait_for_frame(launcher)
+    while launcher.catalog_loading:
+        Gtk.main_iteration_do(True)
+    settle()
+
+    handler, rendered, recorded = [], [], []
+    ranks, recorded_ranks = [], []
+    moved, missing, unmatched = 0, 0, 0
+    for session in sessions:
+        launcher.show_launcher()
+        settle()
+        start = time.perf_counter()
+        for offset_ms, text, handler_ms in session['keys']:
+            recorded.append(handler_ms)
+            if args.realtime:
+                due = start + offset_ms / 1000
+                while time.perf_counter() < due:
+                    if not Gtk.main_iteration_do(False):
+                        time.sleep(0.001)
+            t0 = time.perf_counter()
+            launcher.search_entry.set_text(text)
+            t1 = time.perf_counter()
+            painted = wait_for_frame(launcher)
+            handler.append((t1 - t0) * 1000)
+            if painted:
+                rendered.append((painted - t0) * 1000)
+
+        activation = session.get('activation')
+        # Provider results are not reproduced: the bench runs without providers
+        if activation and activation.get('kind') in ('app', 'profile'):
+            if launcher.search_entry.get_text() != activation['text']:
+                launcher.search_entry.set_text(activation['text'])
+            settle()
+            rows = [row_identity(row) for row in launcher.listbox.get_children()]
+            target = (activation['kind'], activation['id'])
+            if target in rows:
+                rank = rows.index(target)
+                ranks.append(rank)
+                if activation.get('rank') is not None:
+                    recorded_ranks.append(activation['rank'])
+                    moved += rank != activation['rank']
+            else:
+                missing += 1
+        else:
+            unmatched += 1
+
+        launcher.search_entry.set_text("")
+        launcher.hide_launcher()
+        settle()
+
+    search_cache = launcher.search_cache.stats()
+    launcher.destroy()
+
+    def rank_summary(values):
+        if not values:
+            return {'n': 0}
+        return {
+            'n': len(values),
+            'mean': round(statistics.mean(values), 3),
+            'top1': round(sum(r == 0 for r in values) / len(values), 3),
+            'top3': round(sum(r < 3 for r in values) / len(values), 3),
+            'max': max(values),
+        }
+
+    return {
+        'benchmark': 'replay',
+        'revision': git_revision(),
+        'backend': args.backend,
+        'realtime': args.realtime,
+        'sessions': len(sessions),
+        'keystrokes': len(handler),
+        'keystroke_handler_ms': summarize(handler),
+        'keystroke_to_rendered_ms': summarize(rendered),
+        'recorded_handler_ms': summarize(recorded),
+        'activated_rank': rank_summary(ranks),
+        'recorded_activated_rank': rank_summary(recorded_ranks),
+        'rank_changed': moved,
+        'activated_not_found': missing,
+        'sessions_without_result_activation': unmatched,
+        'search_cache': search_cache,
+    }
+
+
+def read_files(paths):
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                while f.read(1 << 20):
+                    pass
+        except OSError:
+            continue
+    return (time.perf_counter() - start) * 1000
+
+
+def advise(paths, advice):
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, advice)
+            finally:
+                os.close(fd)
+        except OSError:
+            continue
+
+
+def bench_prefetch(args):
+    """Read an app's files cold vs after PagePrefetcher-style WILLNEED.
+
+    Pages are evicted with POSIX_FADV_DONTNEED, which needs no root but
+    cannot drop pages other processes have mapped (e.g. libc), so cold
+    numbers are a lower bound.
+    """
+    import pylauncher
+
+    apps = {a['desktop_id']: a for a in pylauncher.ApplicationScanner().load(pylauncher.xdg_application_dirs())}
+    prefetcher = pylauncher.PagePrefetcher(args.budget_mb * 1024 * 1024)
+    report = []
+    for desktop_id in args.desktop_ids:
+        app = apps.get(desktop_id)
+        executable = app and prefetcher.executable_for(app['desktop_path'], app['app_info'])
+        if not executable:
+            report.append({'desktop_id': desktop_id, 'error': "not found"})
+            continue
+        files = prefetcher.files_for(executable)
+        paths = [path for path, _ in files]
+
+        cold, warm = [], []
+        for _ in range(args.repeat):
+            advise(paths, os.POSIX_FADV_DONTNEED)
+            cold.append(read_files(paths))
+            advise(paths, os.POSIX_FADV_DONTNEED)
+            prefetcher.warmed.clear()
+            prefetcher._prefetch([(desktop_id, app['desktop_path'], app['app_info'])])
+            time.sleep(args.lead)
+            warm.append(read_files(paths))
+
+        report.append({
+            'desktop_id': desktop_id,
+            'executable': executable,
+            'files': len(files),
+            'bytes': sum(size for _, size in files),
+            'cold_read_ms': summarize(cold),
+            'prefetched_read_ms': summarize(warm),
+        })
+
+    return {
+        'benchmark': 'prefetch',
+        'revision': git_revision(),
+        'lead_seconds': args.lead,
+        'apps': report,
+        'prefetcher_stats': prefetcher.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    discovery = sub.add_parser('discovery', help="desktop entry discovery and parsing")
+    discovery.add_argument('--apps', type=int, default=5000)
+    discovery.add_argument('--data-dirs', type=int, default=4)
+    discovery.add_argument('--repeat', type=int, default=5)
+    discovery.set_defaults(func=bench_discovery)
+
+    ui = sub.add_parser('ui', help="end-to-end GTK latency on a headless backend")
+    ui.add_argument('--backend', choices=['broadway', 'current'], default='broadway',
+                    help="'current' uses the existing display, e.g. under xvfb-run")
+    ui.add_argument('--display', default=':94', help="broadwayd display to start")
+    ui.add_argument('--apps', type=int, default=1000)
+    ui.add_argument('--data-dirs', type=int, default=2)
+    ui.add_argument('--favorites', type=int, default=12)
+    ui.add_argument('--repeat', type=int, default=5)
+    ui.add_argument('--queries', nargs='+', default=['synthetic app 12', 'tool', 'item9', 'zzz'])
+    ui.set_defaults(func=bench_ui)
+
+    replay = sub.add_parser('replay', help="replay recorded searches (settings: record_queries)")
+    replay.add_argument('--log', default=None, help="query log, default ~/.local/share/pylauncher/query-log.jsonl")
+    replay.add_argument('--sessions', type=int, default=0, help="only the most recent N sessions")
+    replay.add_argument('--realtime', action='store_true', help="reproduce the recorded typing gaps")
+    replay.add_argument('--backend', choices=['broadway', 'current'], default='broadway')
+    replay.add_argument('--display', default=':94')
+    replay.set_defaults(func=bench_replay)
+
+    prefetch = sub.add_parser('prefetch', help="page-cache prefetch effect on real apps")
+    prefetch.add_argument('desktop_ids', nargs='+', help="e.g. firefox.desktop")
+    prefetch.add_argument('--lead', type=float, default=0.5,
+                          help="seconds between prefetch and launch, e.g. time spent typing")
+    prefetch.add_argument('--budget-mb', type=int, default=256)
+    prefetch.add_argument('--repeat', type=int, default=3)
+    prefetch.set_defaults(func=bench_prefetch)
+
+    args = parser.parse_args()
+    json.dump(args.func(args), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+class Cancellable:
+    def is_cancelled(self):
+        return False
+
+
+def make_places(path, places, bookmarks):
+    """A minimal places.sqlite, left open in WAL mode like a running Firefox"""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA wal_autocheckpoint=0")
+    db.execute("CREATE TABLE moz_places (id INTEGER PRIMARY KEY, url TEXT, title TEXT,"
+               " visit_count INTEGER, hidden INTEGER, frecency INTEGER)")
+    db.execute("CREATE TABLE moz_bookmarks (id INTEGER PRIMARY KEY, type INTEGER, fk INTEGER, title TEXT)")
+    db.executemany("INSERT INTO moz_places VALUES (?, ?, ?, ?, ?, ?)", places)
+    db.executemany("INSERT INTO moz_bookmarks (type, fk, title) VALUES (?, ?, ?)", bookmarks)
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def places(tmp_path):
+    profile = tmp_path / "firefox" / "abcd.default"
+    profile.mkdir(parents=True)
+    path = profile / "places.sqlite"
+    db = make_places(path, [
+        (1, "https://docs.python.org/3/library/sqlite3.html", "sqlite3 — Python docs", 12, 0, 900),
+        (2, "https://sqlite.org/fts5.html", "SQLite FTS5 Extension", 3, 0, 400),
+        (3, "https://sqlite.org/lang.html", "SQLite language reference", 40, 0, 2000),
+        (4, "https://example.com/hidden", "sqlite hidden redirect", 5, 1, 5000),
+        (5, "place:sort=8", "sqlite smart folder", 0, 0, 0),
+    ], [
+        (1, 2, "FTS5 manual"),
+        (1, 5, None),
+        (2, None, "Toolbar"),
+    ])
+    yield path
+    db.close()
+
+
+def test_snapshot_copy_leaves_the_live_database_alone(places, tmp_path):
+    assert os.path.exists(str(places) + "-wal")
+    before = {suffix: os.stat(str(places) + suffix).st_mtime_ns for suffix in ('', '-wal')}
+    # Firefox holds an exclusive lock while it runs
+    locker = sqlite3.connect(places, timeout=0)
+    locker.execute("BEGIN EXCLUSIVE")
+    try:
+        provider = pylauncher.BookmarkProvider([('firefox', str(places))], tmp_path / "index" / "bookmarks.db")
+        assert provider.refresh() == 1
+    finally:
+        locker.rollback()
+        locker.close()
+
+    assert {suffix: os.stat(str(places) + suffix).st_mtime_ns for suffix in ('', '-wal')} == before
+    # The private copies are removed once read
+    assert sorted(p.name for p in (tmp_path / "index").iterdir() if p.is_dir()) == []
+
+
+def test_index_uses_fts5_and_ranks_bookmarks_then_frecency(places, tmp_path):
+    provider = pylauncher.BookmarkProvider([('firefox', str(places))], tmp_path / "bookmarks.db")
+    provider.refresh()
+    provider.last_refresh = time.monotonic()
+
+    results = provider.query("sqlite", Cancellable())
+    if sqlite3.connect(":memory:").execute(
+            "SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]:
+        assert provider.fts
+    # Hidden places and place: queries are never indexed
+    assert [r['action'] for r in results] == [
+        ('open', "https://sqlite.org/fts5.html"),
+        ('open', "https://sqlite.org/lang.html"),
+        ('open', "https://docs.python.org/3/library/sqlite3.html"),
+    ]
+    assert results[0]['title'] == "FTS5 manual"
+    assert results[0]['subtitle'] == "Bookmark · sqlite.org"
+    assert results[1]['subtitle'] == "History · sqlite.org"
+
+    # Every term must match, by word prefix
+    assert [r['title'] for r in provider.query("sqli lang", Cancellable())] == ["SQLite language reference"]
+
+
+def test_refresh_reads_only_changed_sources(places, tmp_path):
+    bookmarks = tmp_path / "Bookmarks"
+    bookmarks.write_text(json.dumps({'roots': {'bookmark_bar': {'type': 'folder', 'children': [
+        {'type': 'url', 'name': "SQLite home", 'url': "https://sqlite.org/"},
+    ]}}}))
+    sources = [('firefox', str(places)), ('chromium-bookmarks', str(bookmarks))]
+    provider = pylauncher.BookmarkProvider(sources, tmp_path / "bookmarks.db")
+    assert provider.refresh() == 2
+    assert provider.refresh() == 0
+
+    bookmarks.write_text(json.dumps({'roots': {}}))
+    os.utime(bookmarks, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert provider.refresh() == 1
+
+    # A profile that disappeared takes its rows with it
+    provider.sources = [('chromium-bookmarks', str(bookmarks))]
+    provider.refresh()
+    provider.last_refresh = time.monotonic()
+    assert provider.query("sqlite", Cancellable()) == []
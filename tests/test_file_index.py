@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+class Cancellable:
+    def is_cancelled(self):
+        return False
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+
+
+def opened(results):
+    return [os.path.basename(os.path.dirname(r['action'][1])) + "/" + r['title'] for r in results]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "home"
+    # Far more matches than one query shows, created before the best one
+    for i in range(600):
+        touch(root / f"proj{i:03d}" / "readme.md")
+    touch(root / "readme.md")
+    touch(root / "notes" / "readme")
+    touch(root / "notes" / "readmefirst.txt")
+    touch(root / ".hidden" / "readme.md")
+    return root
+
+
+def test_best_matches_come_first(tree, tmp_path):
+    provider = pylauncher.FileIndexProvider(tree, tmp_path / "index")
+    assert provider.refresh()
+
+    results = provider.query("readme", Cancellable())
+    assert len(results) == provider.max_results
+    # The exact name, then the shallowest, shortest paths; hidden trees are skipped
+    assert opened(results)[:3] == ["notes/readme", "home/readme.md", "proj000/readme.md"]
+    assert "notes/readmefirst.txt" not in opened(results)
+    # Completions of the term follow the exact token's paths
+    assert opened(provider.query("readmef", Cancellable())) == ["notes/readmefirst.txt"]
+    assert opened(provider.query("notes readme", Cancellable())) == ["notes/readme", "notes/readmefirst.txt"]
+
+
+def test_changes_go_to_the_delta_until_merged(tree, tmp_path, monkeypatch):
+    provider = pylauncher.FileIndexProvider(tree, tmp_path / "index")
+    provider.refresh()
+    main_stamp = os.stat(tmp_path / "index" / "tokens.idx").st_mtime_ns
+    assert not provider.refresh()
+
+    touch(tree / "proj007" / "zebra.txt")
+    for name in os.listdir(tree / "proj008"):
+        os.remove(tree / "proj008" / name)
+    os.rmdir(tree / "proj008")
+    assert provider.refresh()
+    assert os.stat(tmp_path / "index" / "tokens.idx").st_mtime_ns == main_stamp
+    assert opened(provider.query("zebra", Cancellable())) == ["proj007/zebra.txt"]
+    assert not [r for r in provider.query("proj008", Cancellable())]
+
+    # A file turned into a directory changes kind
+    os.remove(tree / "proj009" / "readme.md")
+    touch(tree / "proj009" / "readme.md" / "inner.txt")
+    provider.refresh()
+    assert provider.query("inner", Cancellable())[0]['action'][1].endswith("proj009/readme.md/inner.txt")
+
+    monkeypatch.setattr(pylauncher, 'FILE_INDEX_DELTA_MAX', 0)
+    touch(tree / "notes" / "yak.txt")
+    assert provider.refresh()
+    assert len(provider.tables['delta-paths']) == 0
+    assert opened(provider.query("zebra", Cancellable())) == ["proj007/zebra.txt"]
+    assert opened(provider.query("yak", Cancellable())) == ["notes/yak.txt"]
+    assert not provider.query("proj008", Cancellable())
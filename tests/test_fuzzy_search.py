@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+def reference_distance(a, b):
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ca != cb))
+    return row[-1]
+
+
+def test_levenshtein_matches_the_textbook_definition():
+    rng = random.Random(7)
+    for _ in range(500):
+        a = ''.join(rng.choices("abcde", k=rng.randint(0, 9)))
+        b = ''.join(rng.choices("abcde", k=rng.randint(0, 9)))
+        assert pylauncher.levenshtein(a, b) == reference_distance(a, b)
+    assert pylauncher.levenshtein("firefox", "firefix") == 1
+
+
+def test_bk_tree_finds_every_word_within_the_distance():
+    rng = random.Random(11)
+    words = {''.join(rng.choices("abcdefg", k=rng.randint(3, 8))) for _ in range(2000)}
+    tree = pylauncher.BKTree(words)
+    for query in ["abcd", "gfedcba", "aaaa", "bead"]:
+        for max_distance in (1, 2, 3):
+            expected = sorted((reference_distance(query, w), w) for w in words
+                              if reference_distance(query, w) <= max_distance)
+            assert tree.search(query, max_distance) == expected
+            steps = list(tree.search_steps(query, max_distance, step=16))
+            assert steps[-1] == expected and set(steps[:-1]) <= {None}
+    assert pylauncher.BKTree().search("abc", 2) == []
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+class Cancellable:
+    def is_cancelled(self):
+        return False
+
+
+def commands(provider):
+    return {command: count for command, (count, _) in provider.commands.items()}
+
+
+def test_bash_history_is_followed_by_appended_records(tmp_path):
+    path = tmp_path / "bash_history"
+    path.write_bytes(b"#1700000000\nmake test\nls\nmake test\ngit sta")
+    provider = pylauncher.HistoryProvider([(str(path), 'bash')])
+    provider.refresh()
+    # The unfinished last line waits for its newline
+    assert commands(provider) == {"make test": 2, "ls": 1}
+    assert provider.positions[str(path)][1] == len(b"#1700000000\nmake test\nls\nmake test\n")
+
+    with open(path, 'ab') as f:
+        f.write(b"tus\n")
+    provider.refresh()
+    assert commands(provider) == {"make test": 2, "ls": 1, "git status": 1}
+
+    results = provider.query("ma", Cancellable())
+    assert [r['action'] for r in results] == [('run', "make test")]
+    assert results[0]['subtitle'] == "History · run 2×"
+
+
+def test_replaced_file_is_read_again(tmp_path):
+    path = tmp_path / "bash_history"
+    path.write_text("one\ntwo\nthree\n")
+    provider = pylauncher.HistoryProvider([(str(path), 'bash')])
+    provider.refresh()
+    replacement = tmp_path / "new_history"
+    replacement.write_text("four\n")
+    os.replace(replacement, path)
+    provider.refresh()
+    assert commands(provider) == {"four": 1}
+
+
+def test_fish_and_zsh_records(tmp_path):
+    fish = tmp_path / "fish_history"
+    fish.write_text("- cmd: echo a\\nb\n  when: 1700000001\n- cmd: cd src\n  when: 1700000002\n"
+                    "  paths:\n    - src\n- cmd: cd src\n  when: 1700000003\n")
+    # zsh continues lines with a backslash and stores "é" metafied
+    zsh = tmp_path / "zsh_history"
+    zsh.write_bytes(b": 1700000004:0;for f in *; do\\\necho $f\\\ndone\n"
+                    b": 1700000005:0;echo caf\x83\xe3\x83\x89\n")
+    provider = pylauncher.HistoryProvider([(str(fish), 'fish'), (str(zsh), 'zsh')])
+    provider.refresh()
+    assert commands(provider) == {
+        "echo a\nb": 1,
+        "cd src": 2,
+        "for f in *; do\necho $f\ndone": 1,
+        "echo café": 1,
+    }
+    assert provider.commands["cd src"][1] == 1700000003
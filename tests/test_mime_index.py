@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+def app(desktop_id, *mime_types):
+    return {'desktop_id': desktop_id, 'name': desktop_id, 'mime_types': list(mime_types)}
+
+
+@pytest.fixture(autouse=True)
+def mime_tree(monkeypatch):
+    # Source code is a kind of text/plain, everything of octet-stream
+    parents = {'text/x-python': {'text/plain', 'application/octet-stream'},
+               'text/x-csrc': {'text/plain', 'application/octet-stream'},
+               'text/plain': {'application/octet-stream'}}
+    monkeypatch.setattr(pylauncher.Gio, 'content_type_is_a',
+                        lambda mime, parent: mime == parent or parent in parents.get(mime, ()))
+
+
+def ranked(index, mime):
+    return [(app['desktop_id'], is_default) for app, is_default in index.apps_for(mime)]
+
+
+def test_defaults_then_handlers_then_parent_types():
+    apps = [app("gedit", "text/plain"), app("idle", "text/x-python"),
+            app("vim", "text/plain"), app("hexedit", "application/octet-stream")]
+    index = pylauncher.MimeIndex(apps, {
+        'Default Applications': {'text/plain': ["uninstalled", "vim", "gedit"]},
+        'Added Associations': {'text/x-python': ["gedit"]},
+        'Removed Associations': {'text/plain': ["gedit"]},
+    })
+    # Only the first installed default is marked; later ones are fallbacks
+    assert ranked(index, 'text/plain') == [("vim", True), ("gedit", False)]
+    # Apps for the type itself come before the parent type's, and its
+    # default is not the default here; octet-stream handlers never show
+    assert ranked(index, 'text/x-python') == [("gedit", False), ("idle", False), ("vim", False)]
+    # With no handlers of its own, the parent's default stands in
+    assert ranked(index, 'text/x-csrc') == [("vim", True), ("gedit", False)]
+    assert ranked(index, 'image/png') == []
+
+
+def test_results_are_cached_per_type():
+    index = pylauncher.MimeIndex([app("gedit", "text/plain")])
+    assert index.apps_for('text/plain') is index.apps_for('text/plain')
@@ -0,0 +1,101 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+def window(window_id, app_id, focused=False):
+    return {'id': window_id, 'app_id': app_id, 'title': app_id, 'is_focused': focused}
+
+
+def test_event_stream_updates_window_table():
+    provider = pylauncher.NiriWindowProvider("/nonexistent")
+    events = [
+        {'WindowsChanged': {'windows': [window(1, "firefox"), window(2, "Alacritty", focused=True)]}},
+        {'WindowOpenedOrChanged': {'window': window(3, "firefox", focused=True)}},
+        {'WindowOpenedOrChanged': {'window': dict(window(2, "Alacritty"), title="vim")}},
+        {'WindowClosed': {'id': 1}},
+        {'WindowFocusChanged': {'id': 2}},
+        {'SomethingElse': {}},
+    ]
+    for event in events:
+        provider.handle_event(event)
+
+    assert sorted(provider.windows) == [2, 3]
+    assert provider.windows[2]['title'] == "vim"
+    assert 1 not in provider.focus_order
+    assert provider.find_window({"firefox"})['id'] == 3
+    assert provider.find_window({"alacritty"})['id'] == 2
+    assert provider.find_window({"kitty"}) is None
+
+
+def test_most_recently_focused_window_wins():
+    provider = pylauncher.NiriWindowProvider("/nonexistent")
+    provider.handle_event({'WindowsChanged': {'windows': [window(1, "firefox"), window(2, "firefox")]}})
+    provider.handle_event({'WindowFocusChanged': {'id': 1}})
+    provider.handle_event({'WindowFocusChanged': {'id': 2}})
+    assert provider.find_window({"firefox"})['id'] == 2
+    provider.handle_event({'WindowFocusChanged': {'id': 1}})
+    assert provider.find_window({"firefox"})['id'] == 1
+
+
+class FakeNiri:
+    """Serves a scripted EventStream and answers actions on a unix socket"""
+
+    def __init__(self, path, events):
+        self.events = events
+        self.actions = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(str(path))
+        self.server.listen()
+        self.clients = []
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.clients.append(conn)
+            stream = conn.makefile('rw', encoding='utf-8')
+            request = json.loads(stream.readline())
+            stream.write(json.dumps({'Ok': 'Handled'}) + "\n")
+            if request == "EventStream":
+                for event in self.events:
+                    stream.write(json.dumps(event) + "\n")
+                stream.flush()
+            else:
+                self.actions.append(request)
+                stream.flush()
+                conn.close()
+
+    def close(self):
+        self.server.close()
+        for conn in self.clients:
+            conn.close()
+
+
+def test_provider_follows_fake_socket(tmp_path):
+    fake = FakeNiri(tmp_path / "niri.sock", [
+        {'WindowsChanged': {'windows': [window(7, "org.gnome.Nautilus", focused=True)]}},
+        {'WindowOpenedOrChanged': {'window': window(8, "firefox")}},
+    ])
+    provider = pylauncher.NiriWindowProvider(str(tmp_path / "niri.sock"))
+    provider.start()
+    try:
+        deadline = time.monotonic() + 2
+        while len(provider.windows) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert provider.connected
+        assert provider.find_window({"org.gnome.nautilus"})['id'] == 7
+
+        assert provider.focus(8)
+        assert fake.actions == [{'Action': {'FocusWindow': {'id': 8}}}]
+    finally:
+        fake.close()
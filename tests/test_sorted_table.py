@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+@pytest.fixture
+def table(tmp_path):
+    records = sorted([
+        ("apple", "1"), ("applet", "2"), ("apply", "3"), ("banana", "4"),
+        ("band", "5"), ("bandana", "6"), ("ça", "7"), ("zebra", "8"),
+    ])
+    pylauncher.SortedTable.write(tmp_path / "words.idx", records)
+    return pylauncher.SortedTable.open(tmp_path / "words.idx")
+
+
+def test_lookups(table):
+    assert len(table) == 8
+    assert table.get("band") == "5"
+    assert table.get("ban") is None
+    assert table.get("zzz") is None
+    assert [key for _, key, _ in table.prefix("appl")] == ["apple", "applet", "apply"]
+    assert [key for _, key, _ in table.prefix("ban", limit=2)] == ["banana", "band"]
+    assert list(table.prefix("cherry")) == []
+    # UTF-8 byte order puts non-ASCII keys after ASCII ones
+    assert table.get("ça") == "7"
+    start, end = table.prefix_range("band")
+    assert [table.record(i) for i in range(start, end)] == [("band", "5"), ("bandana", "6")]
+    assert table.prefix_range("x")[0] == table.prefix_range("x")[1]
+
+
+def test_rejects_missing_and_foreign_files(tmp_path):
+    assert pylauncher.SortedTable.open(tmp_path / "missing.idx") is None
+    (tmp_path / "other.idx").write_bytes(b"not a table")
+    assert pylauncher.SortedTable.open(tmp_path / "other.idx") is None
+    pylauncher.SortedTable.write(tmp_path / "empty.idx", [])
+    empty = pylauncher.SortedTable.open(tmp_path / "empty.idx")
+    assert len(empty) == 0 and empty.get("a") is None and list(empty.prefix("a")) == []
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("gi")
+import pylauncher
+
+
+class Cancellable:
+    def is_cancelled(self):
+        return False
+
+
+@pytest.fixture(scope="module")
+def provider(tmp_path_factory):
+    provider = pylauncher.UnicodeProvider(tmp_path_factory.mktemp("unicode") / "unicode.idx")
+    provider._build()
+    return provider
+
+
+def titles(provider, text):
+    return [r['title'] for r in provider.query(text, Cancellable())]
+
+
+def test_every_term_must_match_by_word_prefix(provider):
+    assert titles(provider, "greek small letter alpha")[0] == "Greek Small Letter Alpha"
+    assert titles(provider, "snowm")[0] == "Snowman"
+    assert all("Snowman" in t for t in titles(provider, "snowm"))
+    assert titles(provider, "zzzzz") == []
+
+
+def test_common_characters_rank_before_the_limit(provider):
+    # "letter" alone matches thousands of names; the Latin ones still lead
+    assert titles(provider, "letter a")[:2] == ["Latin Capital Letter A", "Latin Small Letter A"]
+    [result] = provider.query("snowman", Cancellable())[:1]
+    assert result['action'] == ('copy', "☃")
+    assert result['subtitle'].startswith("U+2603")
+    assert len(provider.query("letter", Cancellable())) == provider.max_results